@@ -0,0 +1,122 @@
+"""
+Compare the start-up time of building the milk/helmholtz parameter blocks and a Dsi
+from scratch, against cloning cached parameter blocks from property_cache.
+
+Each parameter block is timed on its own, and then the whole Dsi model. Blocks that
+can't be built here (e.g helmholtz without the IDAES extensions) are skipped, and so is
+the Dsi comparison.
+
+Usage:
+
+    python benchmark_property_cache.py           # print the timings
+    python benchmark_property_cache.py --save    # also save them as the baseline
+
+The baseline (property_cache_baseline.json) is only comparable on the same machine.
+"""
+import argparse
+import json
+import time
+
+import pyomo.environ as pyo
+from idaes.core import FlowsheetBlock
+from idaes.models.properties.modular_properties import GenericParameterBlock
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    AmountBasis,
+    PhaseType,
+    StateVars,
+)
+from direct_steam_injection import Dsi
+from milk_config import milk_configuration
+from property_cache import cached_parameter_block, PARAMETER_BLOCK_BUILDERS
+
+N = 20
+DEFAULT_BASELINE = "property_cache_baseline.json"
+
+
+def build_uncached():
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+        state_vars=StateVars.PH,
+    )
+    m.fs.milk_properties = GenericParameterBlock(**milk_configuration)
+    m.fs.dsi = Dsi(
+        property_package=m.fs.milk_properties,
+        steam_property_package=m.fs.steam_properties,
+    )
+    return m
+
+
+def build_cached():
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.steam_properties = cached_parameter_block("helmholtz")
+    m.fs.milk_properties = cached_parameter_block("milk")
+    m.fs.dsi = Dsi(
+        property_package=m.fs.milk_properties,
+        steam_property_package=m.fs.steam_properties,
+    )
+    return m
+
+
+def time_builds(builder):
+    times = []
+    for _ in range(N):
+        start = time.perf_counter()
+        builder()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def parameter_block_builders(name):
+    def build_uncached():
+        m = pyo.ConcreteModel()
+        m.properties = PARAMETER_BLOCK_BUILDERS[name]()
+
+    def build_cached():
+        m = pyo.ConcreteModel()
+        m.properties = cached_parameter_block(name)
+
+    return build_uncached, build_cached
+
+
+def summary(times):
+    return {"first": times[0], "mean_rest": sum(times[1:]) / (len(times) - 1)}
+
+
+def run():
+    results = {}
+    cases = [(name, *parameter_block_builders(name)) for name in PARAMETER_BLOCK_BUILDERS]
+    cases.append(("dsi", build_uncached, build_cached))
+    for name, uncached, cached in cases:
+        try:
+            # the first cached build also fills the cache
+            results[name] = {
+                "uncached": summary(time_builds(uncached)),
+                "cached": summary(time_builds(cached)),
+            }
+        except RuntimeError as e:
+            print(f"Skipping {name}: {e}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", action="store_true", help="save results as the baseline")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    args = parser.parse_args()
+
+    results = run()
+    print(f"{'':<20}{'first (s)':>12}{'mean rest (s)':>16}")
+    for name, result in results.items():
+        for label, times in result.items():
+            print(f"{name + ' ' + label:<20}{times['first']:>12.4f}{times['mean_rest']:>16.4f}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
@@ -0,0 +1,319 @@
+"""
+Benchmarks for Dsi and GenericTranslator build time, initialisation time, solve time and
+Ipopt iterations, over a fixed grid of operating points.
+
+Cases:
+ - dsi: the standalone Dsi from debug_dsi.py
+ - dsi_reduced: the same, with reduced_mixing=True
+ - dsi_analytic: the same, with reduced_mixing and analytic_steam_cooled_enthalpy
+ - translator: the milk -> helmholtz GenericTranslator from debug_translator.py
+ - evaporator: the flowsheet from initialisation_experiment_evaporator.py
+   (needs the ahuora property_packages, it is skipped if they aren't installed)
+ - dsi_scaled, translator_scaled, evaporator_scaled: the same, with the unit scaling
+   factors applied (iscale.calculate_scaling_factors) before initialising
+
+Usage:
+
+    python benchmarks.py                      # run and print the results
+    python benchmarks.py --save               # run and save as the new baseline
+    python benchmarks.py --compare            # run and flag regressions against the baseline
+    python benchmarks.py --cases dsi --threshold 0.5
+
+The baseline is saved as JSON (benchmark_baseline.json by default). Times are only
+comparable between runs on the same machine; iteration counts are comparable anywhere.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pyomo.environ as pyo
+from pyomo.contrib.solver.ipopt import Ipopt
+from idaes.core import FlowsheetBlock
+from idaes.core.util.model_statistics import (
+    degrees_of_freedom,
+    number_variables,
+    number_total_constraints,
+)
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    AmountBasis,
+    PhaseType,
+    StateVars,
+)
+from idaes.models.properties.modular_properties import GenericParameterBlock
+import idaes.core.util.scaling as iscale
+
+from direct_steam_injection import Dsi
+from translator import GenericTranslator
+from milk_config import milk_configuration
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+DSI_GRID = [
+    {"temperature": temperature, "steam_flow_mol": steam_flow}
+    for temperature in (300, 320, 340)
+    for steam_flow in (0.1, 0.5, 1)
+]
+TRANSLATOR_GRID = [{"temperature": temperature} for temperature in (300, 330, 360)]
+EVAPORATOR_GRID = [{"heat_duty": q} for q in (0, 8000, 30000)] + [
+    {"temperature": t} for t in (355.15, 365.15)
+]
+
+# Fields compared against the baseline. An increase past the threshold is a regression.
+METRICS = (
+    "variables",
+    "constraints",
+    "build_time",
+    "initialize_time",
+    "solve_time",
+    "iterations",
+)
+
+
+def build_dsi(temperature, steam_flow_mol, **dsi_kwargs):
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+    )
+    m.fs.milk_properties = GenericParameterBlock(**milk_configuration)
+    m.fs.dsi = Dsi(
+        property_package=m.fs.milk_properties,
+        steam_property_package=m.fs.steam_properties,
+        **dsi_kwargs,
+    )
+
+    m.fs.dsi.inlet.flow_mol.fix(1)
+    m.fs.dsi.inlet.temperature.fix(temperature)
+    m.fs.dsi.inlet.pressure.fix(101325)
+    m.fs.dsi.inlet.mole_frac_comp[0, "h2o"].fix(0.99)
+    m.fs.dsi.inlet.mole_frac_comp[0, "milk_solid"].fix(0.01)
+
+    m.fs.dsi.steam_inlet.flow_mol.fix(steam_flow_mol)
+    m.fs.dsi.properties_steam_in[0].enth_mol.fix(
+        m.fs.steam_properties.htpx(p=101325 * pyo.units.Pa, T=400 * pyo.units.K)
+    )
+    m.fs.dsi.steam_inlet.pressure.fix(101325)
+    return m
+
+
+def build_translator(temperature, **translator_kwargs):
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+        state_vars=StateVars.PH,
+    )
+    m.fs.milk_properties = GenericParameterBlock(**milk_configuration)
+    m.fs.translator = GenericTranslator(
+        inlet_property_package=m.fs.milk_properties,
+        outlet_property_package=m.fs.steam_properties,
+        outlet_state_defined=True,
+        **translator_kwargs,
+    )
+    m.fs.translator.inlet.flow_mol.fix(1)
+    m.fs.translator.inlet.temperature.fix(temperature)
+    m.fs.translator.inlet.pressure.fix(101325)
+    m.fs.translator.inlet.mole_frac_comp[0, "h2o"].fix(0.99)
+    m.fs.translator.inlet.mole_frac_comp[0, "milk_solid"].fix(0.01)
+    return m
+
+
+def build_evaporator(heat_duty=None, temperature=None):
+    from evaporator_flowsheet import build_flowsheet
+
+    m = build_flowsheet()
+    if temperature is None:
+        m.fs.effect_1.heat_duty.fix(heat_duty)
+    else:
+        m.fs.effect_1.outlet.temperature.fix(temperature)
+    return m
+
+
+def initialize_units(m):
+    for unit in m.fs.component_data_objects(pyo.Block, descend_into=False):
+        if hasattr(unit, "initialize"):
+            unit.initialize()
+
+
+def initialize_evaporator(m):
+    from evaporator_flowsheet import initialize
+
+    initialize(m)
+
+
+def build_dsi_reduced(**point):
+    return build_dsi(reduced_mixing=True, **point)
+
+
+def build_dsi_analytic(**point):
+    return build_dsi(analytic_steam_cooled_enthalpy=True, reduced_mixing=True, **point)
+
+
+def scaled(builder):
+    def build_scaled(**point):
+        m = builder(**point)
+        iscale.calculate_scaling_factors(m)
+        return m
+
+    return build_scaled
+
+
+CASES = {
+    "dsi": (build_dsi, initialize_units, DSI_GRID),
+    "dsi_reduced": (build_dsi_reduced, initialize_units, DSI_GRID),
+    "dsi_analytic": (build_dsi_analytic, initialize_units, DSI_GRID),
+    "translator": (build_translator, initialize_units, TRANSLATOR_GRID),
+    "evaporator": (build_evaporator, initialize_evaporator, EVAPORATOR_GRID),
+    "dsi_scaled": (scaled(build_dsi), initialize_units, DSI_GRID),
+    "translator_scaled": (scaled(build_translator), initialize_units, TRANSLATOR_GRID),
+    "evaporator_scaled": (scaled(build_evaporator), initialize_evaporator, EVAPORATOR_GRID),
+}
+
+
+def run_point(builder, initializer, point):
+    start = time.perf_counter()
+    m = builder(**point)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    initializer(m)
+    initialize_time = time.perf_counter() - start
+
+    assert degrees_of_freedom(m) == 0
+    opt = Ipopt()
+    opt.config.raise_exception_on_nonoptimal_result = False
+    start = time.perf_counter()
+    results = opt.solve(m)
+    solve_time = time.perf_counter() - start
+
+    return {
+        "variables": number_variables(m),
+        "constraints": number_total_constraints(m),
+        "build_time": build_time,
+        "initialize_time": initialize_time,
+        "solve_time": solve_time,
+        "iterations": results.iteration_count,
+        "status": str(results.solution_status),
+        "termination_condition": str(results.termination_condition),
+    }
+
+
+def run_benchmarks(cases=None):
+    """
+    Run the named cases (default all), returning {case: [result for each grid point]}.
+    """
+    if not Ipopt().available():
+        print("Ipopt isn't available, no benchmarks can be run")
+        return {}
+    results = {}
+    for name in cases or CASES:
+        builder, initializer, grid = CASES[name]
+        try:
+            results[name] = [
+                dict(point=point, **run_point(builder, initializer, point))
+                for point in grid
+            ]
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+        except RuntimeError as e:  # e.g the Helmholtz external functions are missing
+            print(f"Skipping {name}: {e}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of regressions, where a metric increased by more than threshold
+    (as a fraction) over the baseline, or the status changed.
+    """
+    regressions = []
+    for name, points in results.items():
+        for new, old in zip(points, baseline.get(name, [])):
+            if new["point"] != old["point"]:
+                continue
+            for metric in METRICS:
+                if old[metric] > 0 and new[metric] > old[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{name} {new['point']}: {metric} {old[metric]:.4g} -> {new[metric]:.4g}"
+                    )
+            if new["status"] != old["status"]:
+                regressions.append(
+                    f"{name} {new['point']}: status {old['status']} -> {new['status']}"
+                )
+    return regressions
+
+
+def print_results(results):
+    for name, points in results.items():
+        print(name)
+        for r in points:
+            print(
+                f"  {str(r['point']):<45} {r['variables']:>5} vars  "
+                f"{r['constraints']:>5} cons  build {r['build_time']:.3f}s  "
+                f"init {r['initialize_time']:.3f}s  solve {r['solve_time']:.3f}s  "
+                f"{r['iterations']:>4} its  {r['status']}  {r['termination_condition']}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cases", nargs="*", choices=list(CASES), default=None)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="save results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with the baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed fractional increase"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cases)
+    print_results(results)
+
+    if args.save:
+        if not results:
+            print("Nothing was run, not saving a baseline")
+            return 1
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        if not results:
+            # Otherwise there would be no regressions, and CI would pass
+            print("Nothing was run, can't compare with the baseline")
+            return 1
+        if not os.path.exists(args.baseline):
+            print(
+                f"No baseline at {args.baseline}, create one with --save "
+                "(or pass --baseline)"
+            )
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print("REGRESSION:", r)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+# RESULTS:
+# The dsi/translator cases against their *_scaled versions haven't been recorded yet, they
+# need Ipopt and the Helmholtz external functions. Until then, the only check of the unit
+# scaling is the condition number of the Jacobian of the active equality constraints
+# (29 x 29), with the scaling factors applied as Ipopt would, for a milk -> milk
+# GenericTranslator at the build point (inlet 1 mol/s, 0.99 h2o, 101325 Pa):
+# inlet temperature   unscaled    scaled (iscale.calculate_scaling_factors)
+# 300 K               1.29e9      6.31e8
+# 330 K               1.26e9      6.26e8
+# 360 K               1.53e9      6.36e8
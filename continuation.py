@@ -0,0 +1,171 @@
+"""
+Continuation (homotopy) for big changes in the specification of a converged Dsi flowsheet,
+e.g walking m.fs.dsi.outlet.temperature from 330.15 K to 375.15 K.
+
+Starting from the current (converged) solution, the fixed variables are moved towards
+their targets in steps, re-solving from the previous step's solution each time. The step
+grows when a step converges in few iterations, and is cut back (from the last converged
+point) when a step fails, similar to idaes.core.solvers.homotopy but using the
+pyomo.contrib.solver Ipopt interface so the iteration counts can be reported.
+
+Example:
+
+    result = continuation(m, {m.fs.dsi.outlet.temperature[0]: 375.15})
+    result["converged"], result["steps"], result["iterations"], result["time"]
+"""
+import time
+
+from pyomo.environ import value
+from pyomo.contrib.solver.ipopt import Ipopt
+from pyomo.contrib.solver.results import SolutionStatus, TerminationCondition
+import idaes.logger as idaeslog
+
+from state_snapshot import SnapshotIndex
+
+_log = idaeslog.getLogger(__name__)
+
+
+def making_progress(results, reduction=0.5):
+    """
+    Whether an Ipopt solve that stopped at its iteration limit looks like it would converge
+    with more iterations: it isn't in the restoration phase at the end, and the primal
+    infeasibility has dropped to at most reduction times its starting value. True if
+    there is no iteration log to tell from.
+    """
+    log = getattr(results.extra_info, "iteration_log", None)
+    if not log:
+        return True
+    first, last = log[0], log[-1]
+    if last.get("restoration") or str(last.get("iter")).endswith("r"):
+        return False
+    if first.get("inf_pr") is None or last.get("inf_pr") is None:
+        return True
+    return last["inf_pr"] <= reduction * first["inf_pr"]
+
+
+def probe_solve(opt, m, max_iter, probe_iter, options=None):
+    """
+    Solve m with at most probe_iter iterations first. If that hits the limit while making
+    progress (see making_progress), carry on from where it stopped, up to max_iter
+    iterations in total; otherwise stop there, so a failing solve only costs probe_iter
+    iterations rather than max_iter.
+
+    opt must have load_solutions off. The solution is loaded if the solve converged (and
+    the last iterate if it was carried on), otherwise m is left as it was.
+
+    Returns (converged, iterations, results of the last solve).
+    """
+    iterations = 0
+    budget = min(probe_iter, max_iter)
+    while True:
+        results = opt.solve(m, solver_options=dict(options or {}, max_iter=budget))
+        iterations += results.iteration_count or 0
+        if results.solution_status == SolutionStatus.optimal:
+            results.solution_loader.load_vars()
+            return True, iterations, results
+        remaining = max_iter - iterations
+        if (
+            results.termination_condition != TerminationCondition.iterationLimit
+            or remaining <= 0
+            or not making_progress(results)
+        ):
+            return False, iterations, results
+        _log.debug(f"Solve still making progress after {iterations} iterations, carrying on")
+        results.solution_loader.load_vars()
+        budget = remaining
+
+
+def continuation(
+    m,
+    targets,
+    initial_step=0.25,
+    min_step=0.01,
+    max_step=1,
+    iter_target=5,
+    step_growth=2,
+    step_cut=0.5,
+    max_iter=100,
+    probe_iter=20,
+    max_eval=100,
+    options=None,
+    index=None,
+):
+    """
+    Walk the fixed variables in targets ({var: target value}) from their current values to
+    the targets, re-solving m at each step.
+
+    Args:
+        m: the model, converged at the current values.
+        targets: {fixed var: target value}.
+        initial_step, min_step, max_step: step sizes, as fractions of the whole change.
+        iter_target: the step is grown by step_growth when a step takes no more than this
+            many iterations, and cut by step_cut when a step fails.
+        max_iter: Ipopt iteration limit per step. Steps start from the previous converged
+            point and normally take 3-5 iterations, so this only cuts off runaway steps.
+        probe_iter: a step that hasn't converged after this many iterations is only
+            carried on (up to max_iter) if it is making progress, otherwise the step is cut
+            straight away (see probe_solve).
+        max_eval: maximum number of solves.
+        options: other Ipopt options.
+        index: SnapshotIndex of m, to save building a new one on every call.
+
+    Returns a dict with converged, progress (the fraction of the way to the targets that
+    was reached), steps (the number of converged steps), solves, iterations, time, and
+    path (the progress and iterations of each solve).
+    """
+    start = time.perf_counter()
+    index = index or SnapshotIndex(m)
+    opt = Ipopt()
+    opt.config.raise_exception_on_nonoptimal_result = False
+    opt.config.load_solutions = False
+
+    for var in targets:
+        if not var.fixed:
+            raise ValueError(f"{var.name} must be fixed to be used in continuation")
+    start_values = {var: value(var) for var in targets}
+
+    def set_progress(progress):
+        for var, target in targets.items():
+            a = start_values[var]
+            var.set_value(a + (target - a) * progress)
+
+    progress = 0
+    step = initial_step
+    last_converged = index.take()
+    path = []
+    iterations = 0
+    steps = 0
+    while progress < 1 and len(path) < max_eval:
+        trial = min(progress + step, 1)
+        set_progress(trial)
+        converged, its, _ = probe_solve(opt, m, max_iter, probe_iter, options)
+        iterations += its
+        path.append({"progress": trial, "iterations": its, "converged": converged})
+
+        if converged:
+            last_converged = index.take()
+            progress = trial
+            steps += 1
+            if its <= iter_target:
+                step = min(step * step_growth, max_step)
+        else:
+            _log.debug(f"Step to {trial:.3f} failed, cutting the step")
+            index.restore(last_converged)
+            step *= step_cut
+            if step < min_step:
+                break
+
+    if progress < 1:
+        _log.warning(f"Continuation stopped at {progress:.3f} of the way to the targets")
+        index.restore(last_converged)
+        set_progress(progress)
+
+    return {
+        "converged": progress >= 1,
+        "progress": progress,
+        "steps": steps,
+        "solves": len(path),
+        "iterations": iterations,
+        "time": time.perf_counter() - start,
+        "path": path,
+    }
@@ -0,0 +1,101 @@
+"""
+Block triangular decomposition solve for square Dsi/translator flowsheets.
+
+A simulation flowsheet like the evaporator one in initialisation_experiment_evaporator.py
+is square and nearly acyclic, so it can be split into strongly connected components and
+solved one component at a time, in order: 1x1 components by a scalar Newton solve
+(calculate_variable_from_constraint) and the few larger ones with Ipopt. Each of these
+is far smaller than the whole flowsheet. If anything fails, or the result doesn't satisfy
+all the constraints, the model is put back and solved with Ipopt as a whole.
+
+Example:
+
+    result = solve_decomposed(m)
+    result["method"], result["converged"], result["blocks"], result["time"]
+"""
+import time
+
+import pyomo.environ as pyo
+from pyomo.contrib.incidence_analysis import IncidenceGraphInterface
+from pyomo.contrib.incidence_analysis.scc_solver import (
+    solve_strongly_connected_components,
+)
+from pyomo.contrib.solver.ipopt import Ipopt
+from pyomo.contrib.solver.results import SolutionStatus
+from idaes.core.util.model_statistics import degrees_of_freedom, large_residuals_set
+import idaes.logger as idaeslog
+
+from state_snapshot import SnapshotIndex
+
+_log = idaeslog.getLogger(__name__)
+
+
+def solve_decomposed(
+    m, block_solver="ipopt", tol=1e-6, fallback=True, index=None, block_options=None
+):
+    """
+    Solve the square model m by its strongly connected components, falling back to a full
+    Ipopt solve if that fails and fallback is True.
+
+    Args:
+        m: square model (zero degrees of freedom).
+        block_solver: solver name (SolverFactory) for the components with more than one
+            variable.
+        tol: largest constraint residual accepted from the decomposition.
+        fallback: solve the whole model with Ipopt if the decomposition fails.
+        index: SnapshotIndex of m, to save building a new one on every call.
+        block_options: options for the block solver.
+
+    Returns a dict with converged, method ("decomposition" or "ipopt"), blocks (number of
+    components), largest_block, time, and iterations (of the fallback Ipopt solve, None if
+    there wasn't one, as the decomposition has no comparable iteration count).
+    """
+    if degrees_of_freedom(m) != 0:
+        raise ValueError("solve_decomposed needs a square model")
+    start = time.perf_counter()
+    index = index or SnapshotIndex(m)
+    before = index.take()
+
+    igraph = IncidenceGraphInterface(m, include_inequality=False)
+    var_blocks, _ = igraph.block_triangularize()
+    result = {
+        "blocks": len(var_blocks),
+        "largest_block": max((len(b) for b in var_blocks), default=0),
+        "iterations": None,
+    }
+
+    solver = pyo.SolverFactory(block_solver)
+    for k, v in (block_options or {}).items():
+        solver.options[k] = v
+    try:
+        solve_strongly_connected_components(m, solver=solver)
+        converged = not large_residuals_set(m, tol)
+        error = None if converged else "constraint residuals above tolerance"
+    except Exception as e:  # scalar Newton or block solve failures
+        converged = False
+        error = repr(e)
+
+    if converged:
+        result.update(
+            converged=True, method="decomposition", time=time.perf_counter() - start
+        )
+        return result
+
+    _log.info(f"Decomposition solve failed ({error})")
+    index.restore(before)
+    if not fallback:
+        result.update(
+            converged=False, method="decomposition", time=time.perf_counter() - start
+        )
+        return result
+
+    opt = Ipopt()
+    opt.config.raise_exception_on_nonoptimal_result = False
+    results = opt.solve(m)
+    result.update(
+        converged=results.solution_status == SolutionStatus.optimal,
+        method="ipopt",
+        iterations=results.iteration_count,
+        time=time.perf_counter() - start,
+    )
+    return result
@@ -2,9 +2,11 @@
 from pyomo.environ import (
     Var,
     Suffix,
+    value,
+    check_optimal_termination,
     units as pyunits,
 )
-from pyomo.common.config import ConfigBlock, ConfigValue, In
+from pyomo.common.config import ConfigBlock, ConfigValue, In, Bool
 from idaes.core.util.tables import create_stream_table_dataframe
 from idaes.core.util.exceptions import ConfigurationError
 
@@ -15,12 +17,29 @@ from idaes.core import (
     useDefault,
 )
 from idaes.core.util.config import is_physical_parameter_block
+from idaes.models.properties.modular_properties.base.utility import get_method
+from idaes.core.util.model_statistics import degrees_of_freedom
+from idaes.core.solvers import get_solver
+from idaes.models.properties.general_helmholtz import HelmholtzThermoExpressions
+from idaes.models.properties.general_helmholtz.helmholtz_functions import (
+    HelmholtzParameterBlockData,
+)
 import idaes.core.util.scaling as iscale
 import idaes.logger as idaeslog
+from reference_offsets import (
+    load_offsets,
+    enth_mol_offset_expr,
+    optional_path,
+    enth_mol_offset_correction,
+)
+from unit_scaling import seed_state_scaling, state_scaling_factor
 
 # Set up logger
 _log = idaeslog.getLogger(__name__)
 
+# State variables the initial guesses are written for
+_FTPX_STATE_VARS = {"flow_mol", "mole_frac_comp", "temperature", "pressure"}
+
 
 # When using this file the name "Load" is what is imported
 @declare_process_block_class("Dsi")
@@ -113,6 +132,76 @@ class dsiData(UnitModelBlockData):
     see property package for documentation.}""",
         ),
     )
+    CONFIG.declare(
+        "analytic_steam_cooled_enthalpy",
+        ConfigValue(
+            default=False,
+            domain=Bool,
+            description="Calculate the cooled steam enthalpy without a state block",
+            doc="""Indicates whether the enthalpy of the steam at the inlet fluid temperature and
+    pressure should be calculated directly from the steam property package's htpx function,
+    rather than by building the properties_steam_cooled state block. This removes a full
+    Helmholtz state block (and its phase split) from the model,
+    **default** - False.
+    **Valid values:** {
+    **True** - use a HelmholtzThermoExpressions enthalpy (same as htpx) as an Expression,
+    **False** - build the properties_steam_cooled state block.}""",
+        ),
+    )
+
+    CONFIG.declare(
+        "reduced_mixing",
+        ConfigValue(
+            default=False,
+            domain=Bool,
+            description="Calculate the unheated mixture enthalpy without a state block",
+            doc="""Indicates whether the enthalpy of the mixture at the inlet fluid temperature and
+    pressure should be calculated from the inlet enthalpy plus the pure component liquid
+    enthalpies (enth_mol_liq_comp) of the steam components, rather than by building the
+    properties_mixed_unheated state block and its phase equilibrium. This assumes the steam,
+    once cooled to the inlet temperature, mixes into the inlet as a liquid (ideal mixing).
+    Requires a modular (GenericParameterBlock) property package,
+    **default** - False.
+    **Valid values:** {
+    **True** - use the reduced formulation, without properties_mixed_unheated,
+    **False** - build the properties_mixed_unheated state block.}""",
+        ),
+    )
+
+    CONFIG.declare(
+        "reference_offset_table",
+        ConfigValue(
+            default=None,
+            domain=optional_path,
+            description="Reference enthalpy offset table to correct the energy balance with",
+            doc="""Path to a table from reference_offsets.py. If given, the energy balance is
+    corrected for the difference between the liquid enthalpy offsets (steam package - property
+    package) at the inlet and outlet temperatures, so a difference in heat capacity between the
+    two packages doesn't shift the outlet temperature. The offsets are for pure water, so this
+    assumes the mixture is mostly water,
+    **default** - None (no correction).""",
+        ),
+    )
+
+    CONFIG.declare(
+        "multiply_energy_balance",
+        ConfigValue(
+            default=False,
+            domain=Bool,
+            description="Multiply the energy balance through by the mixed flow",
+            doc="""Indicates whether the energy balance should be written as
+    flow * (outlet enth_mol - mixed enth_mol) == steam_delta_h, rather than dividing
+    steam_delta_h by the mixed flow. The balance is then polynomial rather than rational, so
+    it stays defined as the mixed flow goes to zero. It doesn't make the Jacobian any sparser:
+    jacobian_structure.py gives the same nonzeros and block triangular structure as the
+    default, and no conditioning or Ipopt iteration benefit has been measured. The
+    reduced_mixing formulation is always multiplied through,
+    **default** - False.""",
+        ),
+    )
+
+    # Constant molar heat capacity (J/mol/K, liquid water) used for the outlet temperature guess
+    _cp_mol_guess = 75.3
 
     def build(self):
         # build always starts by calling super().build()
@@ -133,14 +222,15 @@ class dsiData(UnitModelBlockData):
         )
 
         # We need to calculate the enthalpy of the composition, before adding additional enthalpy from the temperature difference.
-        # so we'll add another state block to do that.
+        # so we'll add another state block to do that (unless using the reduced formulation).
         tmp_dict["defined_state"] = False
         tmp_dict["has_phase_equilibrium"] = True
-        self.properties_mixed_unheated = self.config.property_package.state_block_class(
-            self.flowsheet().config.time,
-            doc="Material properties of mixture, before accounting for temperature difference",
-            **tmp_dict,
-        )
+        if not self.config.reduced_mixing:
+            self.properties_mixed_unheated = self.config.property_package.state_block_class(
+                self.flowsheet().config.time,
+                doc="Material properties of mixture, before accounting for temperature difference",
+                **tmp_dict,
+            )
 
         # Add outlet block
         tmp_dict["defined_state"] = False
@@ -166,16 +256,23 @@ class dsiData(UnitModelBlockData):
         # To calculate the amount of enthalpy to add to the inlet fluid, we need to know the difference in enthalpy between steam at that T and P
         # and steam at its inlet conditions. Note this is assuming that effects of composition (the steam will no longer be pure water) are negligible.
         # Note that this state block is just for calcuating, and not an actual inlet or outlet.
-
-        steam_dict["defined_state"] = False  # This doesn't affect pure components.
-        steam_dict["has_phase_equilibrium"] = True
-        self.properties_steam_cooled = (
-            self.config.steam_property_package.state_block_class(
-                self.flowsheet().config.time,
-                doc="Material properties of cooled steam",
-                **steam_dict,
+        if not self.config.analytic_steam_cooled_enthalpy:
+            steam_dict["defined_state"] = False  # This doesn't affect pure components.
+            steam_dict["has_phase_equilibrium"] = True
+            self.properties_steam_cooled = (
+                self.config.steam_property_package.state_block_class(
+                    self.flowsheet().config.time,
+                    doc="Material properties of cooled steam",
+                    **steam_dict,
+                )
+            )
+        elif not isinstance(
+            self.config.steam_property_package, HelmholtzParameterBlockData
+        ):
+            raise ConfigurationError(
+                f"{self.name} analytic_steam_cooled_enthalpy requires a Helmholtz "
+                f"steam property package (e.g HelmholtzParameterBlock)."
             )
-        )
 
         # Add ports
         self.add_port(name="outlet", block=self.properties_out)
@@ -187,41 +284,10 @@ class dsiData(UnitModelBlockData):
         # CONDITIONS
 
         # STEAM INTERMEDIATE BLOCK
-
-        # Temperature (= other inlet temperature)
-        @self.Constraint(
-            self.flowsheet().time,
-            doc="Set the temperature of the cooled steam to be the same as the inlet fluid",
-        )
-        def eq_steam_cooled_temperature(b, t):
-            return (
-                b.properties_steam_cooled[t].temperature
-                == b.properties_milk_in[t].temperature
-            )
-
-        # Pressure (= other inlet pressure)
-        @self.Constraint(
-            self.flowsheet().time,
-            doc="Set the pressure of the cooled steam to be the same as the inlet fluid",
-        )
-        def eq_steam_cooled_pressure(b, t):
-            return (
-                b.properties_steam_cooled[t].pressure
-                == b.properties_milk_in[t].pressure
-            )
-
-        # Flow = steam_flow
-        @self.Constraint(
-            self.flowsheet().time,
-            self.config.steam_property_package.component_list,
-            doc="Set the composition of the cooled steam to be the same as the steam inlet",
-        )
-        def eq_steam_cooled_composition(b, t, c):
-            return 0 == sum(
-                b.properties_steam_cooled[t].get_material_flow_terms(p, c)
-                - b.properties_steam_in[t].get_material_flow_terms(p, c)
-                for p in b.properties_steam_in[t].phase_list
-            )
+        if self.config.analytic_steam_cooled_enthalpy:
+            self._add_analytic_steam_cooled_enthalpy()
+        else:
+            self._add_steam_cooled_state_block_constraints()
 
         # CALCULATE ENTHALPY DIFFERENCE
         @self.Expression(
@@ -234,10 +300,59 @@ class dsiData(UnitModelBlockData):
             """
             return (
                 b.properties_steam_in[t].enth_mol
-                - b.properties_steam_cooled[t].enth_mol
+                - b.steam_cooled_enth_mol[t]
             ) * b.properties_steam_in[t].flow_mol
 
+        if self.config.reference_offset_table is not None:
+            coeffs = load_offsets(self.config.reference_offset_table)[
+                "enth_mol_offset_coeffs"
+            ]
+
+            @self.Expression(
+                self.flowsheet().time,
+                doc="Correction for the reference enthalpy offset between the packages",
+            )
+            def reference_offset_correction(b, t):
+                return enth_mol_offset_expr(
+                    coeffs, b.properties_milk_in[t].temperature
+                ) - enth_mol_offset_expr(coeffs, b.properties_out[t].temperature)
+
         # MIXING (without changing temperature)
+        if self.config.reduced_mixing:
+            self._add_reduced_mixing()
+        else:
+            self._add_mixed_unheated_state_block_constraints()
+
+        # OUTLET BLOCK
+
+        # Pressure (= inlet pressure)
+        @self.Constraint(
+            self.flowsheet().time,
+            doc="Pressure balance",
+        )
+        def eq_outlet_pressure(b, t):
+            return b.properties_out[t].pressure == b.properties_milk_in[t].pressure
+
+        # Flow = mixed flow
+
+        @self.Constraint(
+            self.flowsheet().time,
+            self.config.property_package.component_list,
+            doc="Mass balance for the outlet",
+        )
+        def eq_outlet_composition(b, t, c):
+            return b.mixed_flow_comp[t, c] == sum(
+                b.properties_out[t].get_material_flow_terms(p, c)
+                for p in b.properties_out[t].phase_list
+                if (p, c) in b.properties_out[t].phase_component_set
+            )  # handle the case where a component is not in that phase (e.g no milk vapor)
+
+    def _add_mixed_unheated_state_block_constraints(self):
+        """
+        Set the properties_mixed_unheated state block to the inlet fluid temperature and
+        pressure, with the combined flow of the inlet and the steam, and add the energy balance
+        based on its enthalpy.
+        """
 
         # Pressure (= inlet pressure)
         @self.Constraint(
@@ -283,15 +398,17 @@ class dsiData(UnitModelBlockData):
                 if (p, c) in b.properties_milk_in[t].phase_component_set
             )  # handle the case where a component is not in that phase (e.g no milk vapor)
 
-        # OUTLET BLOCK
-
-        # Pressure (= inlet pressure)
-        @self.Constraint(
+        @self.Expression(
             self.flowsheet().time,
-            doc="Pressure balance",
+            self.config.property_package.component_list,
+            doc="Component flow of the mixture",
         )
-        def eq_outlet_pressure(b, t):
-            return b.properties_out[t].pressure == b.properties_milk_in[t].pressure
+        def mixed_flow_comp(b, t, c):
+            return sum(
+                b.properties_mixed_unheated[t].get_material_flow_terms(p, c)
+                for p in b.properties_mixed_unheated[t].phase_list
+                if (p, c) in b.properties_mixed_unheated[t].phase_component_set
+            )
 
         # Enthalpy (= mixed enthalpy + delta steam enthalpy)
         @self.Constraint(
@@ -299,53 +416,494 @@ class dsiData(UnitModelBlockData):
             doc="Energy balance",
         )
         def eq_outlet_combined_enthalpy(b, t):
+            if b.config.multiply_energy_balance:
+                return b.properties_mixed_unheated[t].flow_mol * (
+                    b.properties_out[t].enth_mol
+                    - b.properties_mixed_unheated[t].enth_mol
+                    - enth_mol_offset_correction(b, t)
+                ) == b.steam_delta_h[t]
             return b.properties_out[t].enth_mol == b.properties_mixed_unheated[
                 t
-            ].enth_mol + (b.steam_delta_h[t] / b.properties_mixed_unheated[t].flow_mol)
+            ].enth_mol + (
+                b.steam_delta_h[t] / b.properties_mixed_unheated[t].flow_mol
+            ) + enth_mol_offset_correction(b, t)
 
-        # Flow = mixed flow
+    def _add_reduced_mixing(self):
+        """
+        Calculate the mixture at the inlet fluid temperature directly: the inlet stream plus the
+        steam components as pure liquids at the inlet temperature. There is no state block or
+        phase equilibrium for the unheated mixture.
+        """
+        steam_components = self.config.steam_property_package.component_list
 
-        @self.Constraint(
+        @self.Expression(
             self.flowsheet().time,
             self.config.property_package.component_list,
-            doc="Mass balance for the outlet",
+            doc="Component flow of the mixture",
         )
-        def eq_outlet_composition(b, t, c):
+        def mixed_flow_comp(b, t, c):
+            milk_in = b.properties_milk_in[t]
+            steam_in = b.properties_steam_in[t]
+            return sum(
+                milk_in.get_material_flow_terms(p, c)
+                for p in milk_in.phase_list
+                if (p, c) in milk_in.phase_component_set
+            ) + (
+                sum(steam_in.get_material_flow_terms(p, c) for p in steam_in.phase_list)
+                if c in steam_components
+                else 0
+            )
+
+        @self.Expression(
+            self.flowsheet().time,
+            doc="Enthalpy flow of the mixture at the inlet temperature",
+        )
+        def mixed_enthalpy_flow(b, t):
+            milk_in = b.properties_milk_in[t]
+            steam_in = b.properties_steam_in[t]
+            return milk_in.flow_mol * milk_in.enth_mol + sum(
+                sum(steam_in.get_material_flow_terms(p, c) for p in steam_in.phase_list)
+                * get_method(milk_in, "enth_mol_liq_comp", c)(
+                    milk_in, milk_in.params.get_component(c), milk_in.temperature
+                )
+                for c in self.config.property_package.component_list
+                if c in steam_components
+            )
+
+        # Enthalpy (= mixed enthalpy + delta steam enthalpy)
+        @self.Constraint(
+            self.flowsheet().time,
+            doc="Energy balance",
+        )
+        def eq_outlet_combined_enthalpy(b, t):
+            return b.properties_out[t].flow_mol * (
+                b.properties_out[t].enth_mol - enth_mol_offset_correction(b, t)
+            ) == (b.mixed_enthalpy_flow[t] + b.steam_delta_h[t])
+
+    def _add_steam_cooled_state_block_constraints(self):
+        """
+        Link the properties_steam_cooled state block to the inlet fluid temperature and pressure,
+        and to the steam inlet flow.
+        """
+
+        # Temperature (= other inlet temperature)
+        @self.Constraint(
+            self.flowsheet().time,
+            doc="Set the temperature of the cooled steam to be the same as the inlet fluid",
+        )
+        def eq_steam_cooled_temperature(b, t):
+            return (
+                b.properties_steam_cooled[t].temperature
+                == b.properties_milk_in[t].temperature
+            )
+
+        # Pressure (= other inlet pressure)
+        @self.Constraint(
+            self.flowsheet().time,
+            doc="Set the pressure of the cooled steam to be the same as the inlet fluid",
+        )
+        def eq_steam_cooled_pressure(b, t):
+            return (
+                b.properties_steam_cooled[t].pressure
+                == b.properties_milk_in[t].pressure
+            )
+
+        # Flow = steam_flow
+        @self.Constraint(
+            self.flowsheet().time,
+            self.config.steam_property_package.component_list,
+            doc="Set the composition of the cooled steam to be the same as the steam inlet",
+        )
+        def eq_steam_cooled_composition(b, t, c):
             return 0 == sum(
-                b.properties_out[t].get_material_flow_terms(p, c)
-                - b.properties_mixed_unheated[t].get_material_flow_terms(p, c)
-                for p in b.properties_out[t].phase_list
-                if (p, c) in b.properties_out[t].phase_component_set
-            )  # handle the case where a component is not in that phase (e.g no milk vapor)
+                b.properties_steam_cooled[t].get_material_flow_terms(p, c)
+                - b.properties_steam_in[t].get_material_flow_terms(p, c)
+                for p in b.properties_steam_in[t].phase_list
+            )
+
+        @self.Expression(
+            self.flowsheet().time,
+            doc="Molar enthalpy of the steam at the inlet fluid temperature and pressure",
+        )
+        def steam_cooled_enth_mol(b, t):
+            return b.properties_steam_cooled[t].enth_mol
 
+    def _add_analytic_steam_cooled_enthalpy(self):
+        """
+        Calculate the enthalpy of the steam at the inlet fluid temperature and pressure
+        directly from the Helmholtz functions, so no state block is needed.
+        This is the same calculation as steam_property_package.htpx, but kept symbolic so
+        it is updated by the solver as the inlet temperature changes.
+        """
+        te = HelmholtzThermoExpressions(self, self.config.steam_property_package)
+
+        @self.Expression(
+            self.flowsheet().time,
+            doc="Molar enthalpy of the steam at the inlet fluid temperature and pressure",
+        )
+        def steam_cooled_enth_mol(b, t):
+            return te.h_mol(
+                T=b.properties_milk_in[t].temperature,
+                p=b.properties_milk_in[t].pressure,
+            )
 
     def calculate_scaling_factors(self):
+        seed_state_scaling(
+            sb
+            for t in self.flowsheet().time
+            for sb in (
+                self.properties_milk_in[t],
+                self.properties_steam_in[t],
+                self.properties_out[t],
+            )
+        )
         super().calculate_scaling_factors()
 
-    def initialize(blk, *args, **kwargs):
-        blk.properties_milk_in.initialize()
-        blk.properties_steam_in.initialize()
+        for t in self.flowsheet().time:
+            milk_in = self.properties_milk_in[t]
+            out = self.properties_out[t]
+            sf_flow = state_scaling_factor(milk_in, "flow_mol")
+            sf_p = state_scaling_factor(milk_in, "pressure")
+            sf_t = state_scaling_factor(milk_in, "temperature")
+            sf_h = state_scaling_factor(out, "enth_mol")
 
-        for t in blk.flowsheet().time:
-            # copy temperature and pressure from properties_milk_in to properties_steam_cooled
-            # blk.properties_steam_cooled[t].temperature.set_value(
-            #     blk.properties_milk_in[t].temperature.value
-            # )
-            blk.properties_steam_cooled[t].pressure.set_value(
-                blk.properties_milk_in[t].pressure.value
+            iscale.constraint_scaling_transform(
+                self.eq_outlet_pressure[t], sf_p, overwrite=False
             )
-            # Copy composition from properties_steam_in to properties_steam_cooled
-            blk.properties_steam_cooled[t].flow_mol.set_value(
-                blk.properties_steam_in[t].flow_mol.value
+            for c in self.config.property_package.component_list:
+                iscale.constraint_scaling_transform(
+                    self.eq_outlet_composition[t, c], sf_flow, overwrite=False
+                )
+
+            # steam_delta_h is an Expression, so it is scaled through the energy balance,
+            # which is a flow * enthalpy balance with reduced_mixing or multiply_energy_balance,
+            # else an enthalpy balance.
+            multiplied = self.config.reduced_mixing or self.config.multiply_energy_balance
+            iscale.constraint_scaling_transform(
+                self.eq_outlet_combined_enthalpy[t],
+                sf_h * sf_flow if multiplied else sf_h,
+                overwrite=False,
             )
-            # If it's steam, there's only one component, so we prolly don't need to worry about composition.
-            # But may want TODO this for other cases.
 
-        blk.properties_steam_cooled.initialize()
-        blk.properties_mixed_unheated.initialize()
+            if hasattr(self, "properties_mixed_unheated"):
+                iscale.constraint_scaling_transform(
+                    self.eq_mixed_pressure[t], sf_p, overwrite=False
+                )
+                iscale.constraint_scaling_transform(
+                    self.eq_mixed_temperature[t], sf_t, overwrite=False
+                )
+                for c in self.config.property_package.component_list:
+                    iscale.constraint_scaling_transform(
+                        self.eq_mixed_composition[t, c], sf_flow, overwrite=False
+                    )
+
+            if hasattr(self, "properties_steam_cooled"):
+                sf_steam_flow = state_scaling_factor(self.properties_steam_in[t], "flow_mol")
+                iscale.constraint_scaling_transform(
+                    self.eq_steam_cooled_pressure[t], sf_p, overwrite=False
+                )
+                iscale.constraint_scaling_transform(
+                    self.eq_steam_cooled_temperature[t], sf_t, overwrite=False
+                )
+                for c in self.config.steam_property_package.component_list:
+                    iscale.constraint_scaling_transform(
+                        self.eq_steam_cooled_composition[t, c],
+                        sf_steam_flow,
+                        overwrite=False,
+                    )
+
+    def input_vars(self, t):
+        """
+        The variables that specify the Dsi at time t, by input name (see update_inputs).
+        These are the ones to fix (or to declare as inputs of a SolverSession).
 
-        blk.properties_out.initialize()
-        pass
+        The inlet state variables keep their names, and the steam inlet ones are prefixed
+        with steam_ (e.g steam_enth_mol for a Helmholtz PH steam package, or
+        steam_temperature for an FTPx one). Indexed ones have (name, index) keys, e.g
+        ("mole_frac_comp", "h2o").
+        """
+        inputs = {}
+        for prefix, sb in (
+            ("", self.properties_milk_in[t]),
+            ("steam_", self.properties_steam_in[t]),
+        ):
+            for name, var in sb.define_state_vars().items():
+                if var.is_indexed():
+                    inputs.update({(prefix + name, k): v for k, v in var.items()})
+                else:
+                    inputs[prefix + name] = var
+        inputs["outlet_temperature"] = self.properties_out[t].temperature
+        return inputs
+
+    def update_inputs(self, t=None, **values):
+        """
+        Change the operating point in place, without rebuilding the model.
+
+        Only the values of the (already fixed) input variables are changed, so the model
+        structure, scaling factors and current solution are kept as a starting point,
+        and a SolverSession on the model can be re-solved without rewriting the NL file.
+
+        Args:
+            t: time point to update, or None for all of them
+            any input_vars name, e.g flow_mol, temperature, pressure, steam_flow_mol,
+                steam_pressure, steam_enth_mol, outlet_temperature. Indexed ones take a
+                dict, e.g mole_frac_comp={"h2o": 0.95, "milk_solid": 0.05}.
+            solids_fraction: inlet mole fraction of the component that isn't in the steam
+                property package (e.g milk_solid), the rest is the steam component
+            steam_temperature: if it isn't a steam state variable, sets steam_enth_mol
+                from the steam property package's htpx, at steam_pressure (the new one if
+                it is given as well)
+
+        Returns the list of variables that were changed.
+        """
+        if "solids_fraction" in values:
+            steam_components = self.config.steam_property_package.component_list
+            solids = [
+                c for c in self.config.property_package.component_list
+                if c not in steam_components
+            ]
+            if len(solids) != 1 or len(steam_components) != 1:
+                raise ConfigurationError(
+                    f"{self.name} solids_fraction needs one component that is only in the "
+                    "inlet property package, set mole_frac_comp instead."
+                )
+            x = values.pop("solids_fraction")
+            # A new dict, so the caller's mole_frac_comp isn't changed
+            values["mole_frac_comp"] = {
+                **values.get("mole_frac_comp", {}),
+                solids[0]: x,
+                steam_components.first(): 1 - x,
+            }
+
+        time_points = self.flowsheet().time if t is None else [t]
+        changed = []
+        for t in time_points:
+            inputs = self.input_vars(t)
+            updates = {}
+            for name, val in values.items():
+                if isinstance(val, dict):
+                    updates.update({(name, c): x for c, x in val.items()})
+                elif name in inputs:
+                    updates[name] = val
+                elif name == "steam_temperature":
+                    if not hasattr(self.config.steam_property_package, "htpx"):
+                        raise ConfigurationError(
+                            f"{self.name} steam_temperature can only be set if it is a "
+                            "steam state variable, or the steam property package has an "
+                            "htpx method, set steam_enth_mol instead."
+                        )
+                    steam_pressure = values.get(
+                        "steam_pressure", value(inputs["steam_pressure"])
+                    )
+                    updates["steam_enth_mol"] = value(
+                        self.config.steam_property_package.htpx(
+                            T=val * pyunits.K, p=steam_pressure * pyunits.Pa
+                        )
+                    )
+                else:
+                    raise KeyError(f"{self.name} has no input {name}")
+            for name, val in updates.items():
+                if name not in inputs:
+                    raise KeyError(f"{self.name} has no input {name}")
+                var = inputs[name]
+                var.set_value(val)
+                changed.append(var)
+        return changed
+
+    def initialize(blk, state_args=None, outlvl=idaeslog.NOTSET, solver=None, optarg=None):
+        """
+        Initialise the Dsi sequentially.
+
+        The inlet state blocks are initialised first, and then each internal block gets a
+        first guess before its own initialisation:
+         - the cooled steam enthalpy from the steam package's htpx at the inlet T and P,
+         - the mixed flow and composition from the inlet and steam flows,
+         - the outlet temperature from an energy balance with a constant heat capacity
+           (or, if the outlet temperature is fixed, the steam flow from the same balance).
+        The guesses need FTPx milk states (see _initial_guess), with other property
+        packages they are skipped.
+        Finally the whole unit is solved with the inlets held, if it is square. Inlet
+        state variables are only held where that doesn't over-specify the inlet state
+        block, e.g a steam enthalpy set by a temperature constraint is left free.
+
+        Keyword Arguments:
+            state_args : not used, the inlet states are taken from the current values.
+            outlvl : sets output level of initialization routine
+            optarg : solver options dictionary object (default=None)
+            solver : str indicating which solver to use during initialization
+                (default = None, use default solver)
+
+        Returns:
+            None
+        """
+        init_log = idaeslog.getInitLogger(blk.name, outlvl, tag="unit")
+        solve_log = idaeslog.getSolveLogger(blk.name, outlvl, tag="unit")
+
+        # Steam flows that are to be calculated from a fixed outlet temperature
+        calc_steam_flow = [
+            t
+            for t in blk.flowsheet().time
+            if blk.properties_out[t].temperature.fixed
+            and not blk.properties_steam_in[t].flow_mol.fixed
+        ]
+
+        # Inlets first, so the guesses use their current states (e.g a steam enthalpy
+        # calculated from a temperature constraint)
+        blk.properties_milk_in.initialize(outlvl=outlvl, optarg=optarg, solver=solver)
+        blk.properties_steam_in.initialize(outlvl=outlvl, optarg=optarg, solver=solver)
+
+        for t in blk.flowsheet().time:
+            blk._initial_guess(t, calc_steam_flow=t in calc_steam_flow)
+
+        held = blk._hold_inlets(calc_steam_flow)
+        try:
+            if hasattr(blk, "properties_steam_cooled"):
+                blk.properties_steam_cooled.initialize(
+                    outlvl=outlvl, optarg=optarg, solver=solver
+                )
+            if hasattr(blk, "properties_mixed_unheated"):
+                blk.properties_mixed_unheated.initialize(
+                    outlvl=outlvl, optarg=optarg, solver=solver
+                )
+            blk.properties_out.initialize(outlvl=outlvl, optarg=optarg, solver=solver)
+            init_log.info_high("Initialization Step 1 Complete.")
+
+            if degrees_of_freedom(blk) == 0:
+                # All the time points are solved together, in one solve
+                opt = get_solver(solver, optarg)
+                with idaeslog.solver_log(solve_log, idaeslog.DEBUG) as slc:
+                    res = opt.solve(blk, tee=slc.tee)
+
+                init_log.info_high(
+                    "Initialization Step 2 {}.".format(idaeslog.condition(res))
+                )
+                if not check_optimal_termination(res):
+                    init_log.warning(
+                        f"{blk.name} failed to converge during initialization: "
+                        f"{idaeslog.condition(res)}"
+                    )
+            else:
+                init_log.info_high(
+                    "Initialization Step 2 skipped, unit is not square with the inlets "
+                    "held."
+                )
+        finally:
+            # Put the model back as it was, even if a solve failed
+            for var in held:
+                var.unfix()
+        init_log.info("Initialization Complete.")
+
+    def _hold_inlets(blk, calc_steam_flow=()):
+        """
+        Fix the unfixed state variables of the inlet state blocks, so the unit can be
+        solved on its own. An inlet time point isn't held if fixing its state variables
+        would over-specify it (e.g the steam temperature is set with a constraint, which
+        determines the enthalpy), and the steam flow isn't held at the time points in
+        calc_steam_flow.
+
+        Returns the variables that were fixed, to unfix afterwards.
+        """
+        held = []
+        for t in blk.flowsheet().time:
+            for sb in (blk.properties_milk_in[t], blk.properties_steam_in[t]):
+                fixed_now = []
+                for name, var in sb.define_state_vars().items():
+                    if sb is blk.properties_steam_in[t] and name == "flow_mol" and (
+                        t in calc_steam_flow
+                    ):
+                        continue
+                    for v in var.values():
+                        if not v.fixed:
+                            v.fix()
+                            fixed_now.append(v)
+                if fixed_now and degrees_of_freedom(sb) < 0:
+                    for v in fixed_now:
+                        v.unfix()
+                else:
+                    held.extend(fixed_now)
+        return held
+
+    def _cooled_steam_enth_mol_guess(blk, t):
+        """
+        Enthalpy of the steam at the inlet fluid temperature and pressure, if the steam
+        property package can calculate it directly (e.g Helmholtz), otherwise None.
+        """
+        if not hasattr(blk.config.steam_property_package, "htpx"):
+            return None
+        return value(
+            blk.config.steam_property_package.htpx(
+                T=value(blk.properties_milk_in[t].temperature) * pyunits.K,
+                p=value(blk.properties_milk_in[t].pressure) * pyunits.Pa,
+            )
+        )
+
+    def _initial_guess(blk, t, calc_steam_flow=False):
+        """
+        Write closed form guesses into the internal state blocks at time t. The guesses
+        set flow_mol, mole_frac_comp, temperature and pressure directly, so they are only
+        made if those are the state variables of the milk package (FTPx), and the steam
+        package has a flow_mol state variable.
+        """
+        milk_in = blk.properties_milk_in[t]
+        steam_in = blk.properties_steam_in[t]
+        out = blk.properties_out[t]
+
+        if not (
+            _FTPX_STATE_VARS <= set(milk_in.define_state_vars())
+            and "flow_mol" in steam_in.define_state_vars()
+        ):
+            return
+
+        h_cooled = blk._cooled_steam_enth_mol_guess(t)
+        # Enthalpy released per mol of steam as it cools to the inlet temperature
+        dh_steam = None if h_cooled is None else value(steam_in.enth_mol) - h_cooled
+
+        if calc_steam_flow and dh_steam is not None and dh_steam > 0:
+            steam_flow = (
+                value(milk_in.flow_mol)
+                * blk._cp_mol_guess
+                * (value(out.temperature) - value(milk_in.temperature))
+                / dh_steam
+            )
+            steam_in.flow_mol.set_value(max(steam_flow, 1e-6))
+
+        if hasattr(blk, "properties_steam_cooled"):
+            state_vars = blk.properties_steam_cooled[t].define_state_vars()
+            if "pressure" in state_vars:
+                state_vars["pressure"].set_value(value(milk_in.pressure))
+            if "flow_mol" in state_vars:
+                state_vars["flow_mol"].set_value(value(steam_in.flow_mol))
+            if "enth_mol" in state_vars and h_cooled is not None:
+                state_vars["enth_mol"].set_value(h_cooled)
+            if "temperature" in state_vars:
+                state_vars["temperature"].set_value(value(milk_in.temperature))
+
+        # Mixed flow and composition (components that aren't in the steam come from the inlet only)
+        steam_components = blk.config.steam_property_package.component_list
+        flow_comp = {
+            c: value(milk_in.flow_mol) * value(milk_in.mole_frac_comp[c])
+            + (value(steam_in.flow_mol) if c in steam_components else 0)
+            for c in blk.config.property_package.component_list
+        }
+        flow_mixed = sum(flow_comp.values())
+
+        if dh_steam is not None and not out.temperature.fixed:
+            out.temperature.set_value(
+                value(milk_in.temperature)
+                + value(steam_in.flow_mol) * dh_steam / (flow_mixed * blk._cp_mol_guess)
+            )
+
+        blocks = [out]
+        if hasattr(blk, "properties_mixed_unheated"):
+            blk.properties_mixed_unheated[t].temperature.set_value(
+                value(milk_in.temperature)
+            )
+            blocks.append(blk.properties_mixed_unheated[t])
+        for b in blocks:
+            b.flow_mol.set_value(flow_mixed)
+            b.pressure.set_value(value(milk_in.pressure))
+            for c, flow in flow_comp.items():
+                b.mole_frac_comp[c].set_value(flow / flow_mixed)
 
     def _get_stream_table_contents(self, time_point=0):
         """
@@ -0,0 +1,282 @@
+"""
+Result cache for Dsi unit solves.
+
+The same Dsi inlet conditions recur many times, and each one costs a build, initialize and
+Ipopt solve. DsiResultCache stores the results (outlet state and steam flow) keyed by a
+hash of the inputs, the Dsi options and the property package configurations, with a
+bounded in-memory LRU and an optional directory of JSON files behind it.
+
+The configuration hash (of the milk and steam property package configurations and the Dsi
+options) is part of every key, so changing any of them means old results are never
+returned. On disk, results are kept in <directory>/dsi_results/<property hash>/<options
+hash>/, so caches for different Dsi options can share a directory (and run at the same
+time). When the property package configurations change, the results for the old ones are
+stale, and their directories are deleted when the cache is opened. Only property hash
+directories inside dsi_results are ever deleted, so directory can be shared with anything.
+
+Example:
+
+    cache = DsiResultCache(max_size=1000, directory="dsi_cache")
+    evaluator = DsiEvaluator(cache=cache)
+    result = evaluator.evaluate(
+        flow_mol=50, temperature=351.15, pressure=90000, solids_fraction=0.05,
+        steam_pressure=1e6, steam_temperature=458.15, outlet_temperature=368.15,
+    )
+    result["steam_flow_mol"], result["outlet"]["temperature"]
+"""
+import copy
+import enum
+import hashlib
+import json
+import os
+import re
+import shutil
+import types
+from collections import OrderedDict
+
+import pyomo.environ as pyo
+from pyomo.contrib.solver.ipopt import Ipopt
+from pyomo.contrib.solver.results import SolutionStatus
+from idaes.core import FlowsheetBlock
+import idaes.logger as idaeslog
+
+from direct_steam_injection import Dsi
+from milk_config import milk_configuration
+from property_cache import cached_parameter_block, HELMHOLTZ_CONFIGURATION
+
+_log = idaeslog.getLogger(__name__)
+
+# The inputs that define a Dsi solve (with exactly one of steam_flow_mol/outlet_temperature)
+INPUTS = (
+    "flow_mol",
+    "temperature",
+    "pressure",
+    "solids_fraction",
+    "steam_pressure",
+    "steam_temperature",
+)
+SPECS = ("steam_flow_mol", "outlet_temperature")
+
+# Subdirectory of the cache directory the results are kept in, and the names of the
+# directories the cache creates in it (see _hash)
+RESULTS_DIRECTORY = "dsi_results"
+_HASH_NAME = re.compile(r"[0-9a-f]{16}")
+
+
+def _canonical(obj):
+    """
+    JSON-able version of a configuration dict, with classes, functions, modules, enums and
+    units replaced by their names, so it can be hashed. Names are used rather than str(),
+    which for some objects includes the install path or memory address.
+    """
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda i: str(i[0]))}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if isinstance(obj, types.ModuleType):
+        # e.g state_definition=FTPx
+        return obj.__name__
+    if isinstance(obj, enum.Enum):
+        return f"{type(obj).__qualname__}.{obj.name}"
+    if isinstance(obj, type) or callable(obj):
+        return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+    return str(obj)
+
+
+def _hash(data):
+    return hashlib.sha256(json.dumps(_canonical(data), sort_keys=True).encode()).hexdigest()[:16]
+
+
+def property_hash(configuration=milk_configuration, steam_configuration=HELMHOLTZ_CONFIGURATION):
+    """
+    Hash of the milk and steam (Helmholtz) property package configurations.
+    """
+    return _hash({"configuration": configuration, "steam": steam_configuration})
+
+
+def config_hash(
+    configuration=milk_configuration, steam_configuration=HELMHOLTZ_CONFIGURATION, **dsi_options
+):
+    """
+    Hash of the property package configurations and Dsi options.
+    """
+    return _hash(
+        {"properties": property_hash(configuration, steam_configuration), "dsi": dsi_options}
+    )
+
+
+class DsiResultCache:
+    """
+    Content-addressed cache of Dsi results.
+
+    Args:
+        max_size: maximum number of results kept in memory.
+        directory: optional directory to also keep results in, as JSON files (in its
+            dsi_results subdirectory).
+        configuration: the milk property package configuration the results are for.
+        steam_configuration: the Helmholtz parameter block arguments the results are for.
+        dsi_options: the Dsi config options the results are for.
+    """
+
+    def __init__(
+        self,
+        max_size=1024,
+        directory=None,
+        configuration=milk_configuration,
+        steam_configuration=HELMHOLTZ_CONFIGURATION,
+        dsi_options=None,
+    ):
+        self.max_size = max_size
+        self.dsi_options = dict(dsi_options or {})
+        self.property_hash = property_hash(configuration, steam_configuration)
+        self.config_hash = config_hash(
+            configuration, steam_configuration, **self.dsi_options
+        )
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.directory = None
+        if directory is not None:
+            root = os.path.join(directory, RESULTS_DIRECTORY)
+            self.directory = os.path.join(root, self.property_hash, _hash(self.dsi_options))
+            os.makedirs(self.directory, exist_ok=True)
+            # Only results for other property configurations are stale, results for other
+            # Dsi options (in other subdirectories of this property hash) are kept. Anything
+            # the cache didn't create is left alone.
+            for name in os.listdir(root):
+                path = os.path.join(root, name)
+                if (
+                    name != self.property_hash
+                    and _HASH_NAME.fullmatch(name)
+                    and os.path.isdir(path)
+                ):
+                    _log.info(f"Removing stale Dsi results for property configuration {name}")
+                    shutil.rmtree(path)
+
+    def key(self, inputs):
+        data = json.dumps(
+            {"config": self.config_hash, "inputs": {k: float(v) for k, v in inputs.items()}},
+            sort_keys=True,
+        )
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, inputs):
+        """
+        The stored result for inputs, or None.
+        """
+        key = self.key(inputs)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            # A copy, so the caller can't change the cached result
+            return copy.deepcopy(self._memory[key])
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key)) as f:
+                result = json.load(f)
+            self._remember(key, result)
+            self.hits += 1
+            return copy.deepcopy(result)
+        self.misses += 1
+        return None
+
+    def put(self, inputs, result):
+        key = self.key(inputs)
+        self._remember(key, copy.deepcopy(result))
+        if self.directory is not None:
+            # Write then rename, so other processes never see a half written file
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(key) + f".{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp, self._path(key))
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is not None:
+            shutil.rmtree(self.directory)
+            os.makedirs(self.directory)
+
+
+class DsiEvaluator:
+    """
+    Solves a standalone Dsi for given inputs, through a DsiResultCache. The model is built
+    once and updated in place (Dsi.update_inputs) for each miss.
+    """
+
+    def __init__(self, cache=None, **dsi_options):
+        self.cache = cache if cache is not None else DsiResultCache(dsi_options=dsi_options)
+        if self.cache.dsi_options != dsi_options:
+            raise ValueError("The cache is for different Dsi options")
+        self.dsi_options = dsi_options
+        self.model = None
+        self.opt = Ipopt()
+        self.opt.config.raise_exception_on_nonoptimal_result = False
+
+    def _build(self):
+        m = pyo.ConcreteModel()
+        m.fs = FlowsheetBlock(dynamic=False)
+        m.fs.steam_properties = cached_parameter_block("helmholtz")
+        m.fs.milk_properties = cached_parameter_block("milk")
+        m.fs.dsi = Dsi(
+            property_package=m.fs.milk_properties,
+            steam_property_package=m.fs.steam_properties,
+            **self.dsi_options,
+        )
+        for var in m.fs.dsi.input_vars(0).values():
+            var.fix()
+        return m
+
+    def evaluate(self, **inputs):
+        """
+        Result for the given inputs (INPUTS, and one of SPECS), from the cache if possible.
+        Failed solves are returned but not cached.
+        """
+        specs = [s for s in SPECS if s in inputs]
+        if set(inputs) != set(INPUTS) | set(specs) or len(specs) != 1:
+            raise ValueError(f"Dsi inputs must be {INPUTS} and one of {SPECS}")
+
+        result = self.cache.get(inputs)
+        if result is not None:
+            return result
+
+        result = self.solve(**inputs)
+        if result["converged"]:
+            self.cache.put(inputs, result)
+        return result
+
+    def solve(self, **inputs):
+        if self.model is None:
+            self.model = self._build()
+        dsi = self.model.fs.dsi
+        calc_steam_flow = "outlet_temperature" in inputs
+        dsi.steam_inlet.flow_mol[0].fixed = not calc_steam_flow
+        dsi.outlet.temperature[0].fixed = calc_steam_flow
+        dsi.update_inputs(**inputs)
+        dsi.initialize()
+        results = self.opt.solve(self.model)
+
+        out = dsi.properties_out[0]
+        return {
+            "converged": results.solution_status == SolutionStatus.optimal,
+            "iterations": results.iteration_count,
+            "steam_flow_mol": pyo.value(dsi.properties_steam_in[0].flow_mol),
+            "outlet": {
+                "flow_mol": pyo.value(out.flow_mol),
+                "temperature": pyo.value(out.temperature),
+                "pressure": pyo.value(out.pressure),
+                "mole_frac_comp": {c: pyo.value(x) for c, x in out.mole_frac_comp.items()},
+                "vapor_frac": pyo.value(out.phase_frac["Vap"]),
+            },
+        }
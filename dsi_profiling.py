@@ -0,0 +1,169 @@
+"""
+Opt-in profiling of Dsi and GenericTranslator units.
+
+When a flowsheet containing Dsi units is slow, this reports, for every Dsi and
+GenericTranslator in the model and for each of their internal state blocks and
+unit-level constraints:
+ - the number of active constraints,
+ - the number of external function calls (e.g Helmholtz) per residual evaluation,
+ - the number of Jacobian nonzeros (unfixed variables in each constraint),
+ - python_eval_time: the time Pyomo's value() takes to evaluate all the residuals in
+   Python (averaged over a number of repeats). This is only a relative measure of how
+   expensive each group's expressions are, as Ipopt evaluates them through the ASL, not
+   value().
+
+The solver-side evaluation time comes from profile_solve, which runs Ipopt with its timing
+statistics, to separate time in function evaluations (function_evaluation_time, for the
+whole model) from time in Ipopt itself (mostly the linear algebra).
+
+Example:
+
+    report = profile_units(m)
+    report["ipopt"] = profile_solve(m)
+    write_report(report, "dsi_profile.json")
+"""
+import io
+import json
+import re
+import time
+
+import pyomo.environ as pyo
+from pyomo.common.numeric_types import native_types
+from pyomo.common.tee import capture_output
+from pyomo.core.expr.numeric_expr import ExternalFunctionExpression
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.environ import value
+import idaes.logger as idaeslog
+
+from direct_steam_injection import dsiData
+from translator import GenericTranslatorData
+
+_log = idaeslog.getLogger(__name__)
+
+
+def _count_external_calls(expr):
+    count = 0
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if type(e) in native_types or not e.is_expression_type():
+            continue
+        if isinstance(e, ExternalFunctionExpression):
+            count += 1
+        stack.extend(e.args)
+    return count
+
+
+def _constraint_groups(unit):
+    """
+    Group the active constraints of a unit by the state block they are on,
+    or by constraint name for the unit-level constraints.
+    """
+    groups = {}
+    for c in unit.component_data_objects(pyo.Constraint, active=True, descend_into=True):
+        # Walk up to the block directly below the unit
+        parent = c.parent_block()
+        if parent is unit:
+            name = c.parent_component().local_name
+        else:
+            while parent.parent_block() is not unit:
+                parent = parent.parent_block()
+            name = parent.parent_component().local_name
+        groups.setdefault(name, []).append(c)
+    return groups
+
+
+def _profile_group(constraints, repeats):
+    ext_calls = 0
+    nnz = 0
+    for c in constraints:
+        ext_calls += _count_external_calls(c.body)
+        nnz += sum(1 for _ in identify_variables(c.body, include_fixed=False))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for c in constraints:
+            value(c.body, exception=False)
+    python_eval_time = (time.perf_counter() - start) / repeats
+
+    return {
+        "constraints": len(constraints),
+        "external_calls_per_eval": ext_calls,
+        "jacobian_nonzeros": nnz,
+        "python_eval_time": python_eval_time,
+    }
+
+
+def profile_unit(unit, repeats=10):
+    """
+    Profile a single Dsi or GenericTranslator.
+    """
+    blocks = {
+        name: _profile_group(constraints, repeats)
+        for name, constraints in _constraint_groups(unit).items()
+    }
+    totals = {
+        key: sum(b[key] for b in blocks.values())
+        for key in (
+            "constraints",
+            "external_calls_per_eval",
+            "jacobian_nonzeros",
+            "python_eval_time",
+        )
+    }
+    return {"type": type(unit).__name__, "blocks": blocks, "total": totals}
+
+
+def profile_units(m, repeats=10):
+    """
+    Profile every Dsi and GenericTranslator in the model m.
+
+    Returns a dict of unit name: profile, which can be saved with write_report.
+    """
+    report = {}
+    for unit in m.component_data_objects(pyo.Block, descend_into=True):
+        if isinstance(unit, (dsiData, GenericTranslatorData)):
+            report[unit.name] = profile_unit(unit, repeats=repeats)
+    return report
+
+
+# Lines in the Ipopt output with print_timing_statistics=yes
+_IPOPT_TIMING = {
+    "iterations": r"Number of Iterations\.*:\s*(\d+)",
+    "objective_evaluations": r"Number of objective function evaluations\s*=\s*(\d+)",
+    "constraint_evaluations": r"Number of equality constraint evaluations\s*=\s*(\d+)",
+    "jacobian_evaluations": r"Number of equality constraint Jacobian evaluations\s*=\s*(\d+)",
+    "hessian_evaluations": r"Number of Lagrangian Hessian evaluations\s*=\s*(\d+)",
+    "ipopt_time": r"Total (?:CPU secs|seconds) in IPOPT \(w/o function evaluations\)\s*=\s*([\d.]+)",
+    "function_evaluation_time": r"Total (?:CPU secs|seconds) in NLP function evaluations\s*=\s*([\d.]+)",
+    "linear_solver_time": r"LinearSystemFactorization\.*:\s*([\d.]+)",
+    "backsolve_time": r"LinearSystemBackSolve\.*:\s*([\d.]+)",
+}
+
+
+def profile_solve(m, options=None):
+    """
+    Solve m with Ipopt, with timing statistics turned on, and return the parsed statistics.
+    """
+    opt = pyo.SolverFactory("ipopt")
+    opt.options["print_timing_statistics"] = "yes"
+    for k, v in (options or {}).items():
+        opt.options[k] = v
+
+    output = io.StringIO()
+    with capture_output(output):
+        results = opt.solve(m, tee=True)
+    log = output.getvalue()
+
+    stats = {"termination_condition": str(results.solver.termination_condition)}
+    for key, pattern in _IPOPT_TIMING.items():
+        match = re.search(pattern, log)
+        if match is not None:
+            stats[key] = float(match.group(1))
+    return stats
+
+
+def write_report(report, fname):
+    with open(fname, "w") as f:
+        json.dump(report, f, indent=2)
+    _log.info(f"Wrote profile to {fname}")
@@ -0,0 +1,208 @@
+"""
+Scenario-indexed Dsi and GenericTranslator models.
+
+Rather than rebuilding (or re-solving) a ConcreteModel for every operating point,
+as graph_reference_enthalpy.py does, this builds one flowsheet per scenario on an
+indexed FlowsheetBlock. The state blocks are then effectively indexed by
+(scenario, time), e.g m.fs[s].dsi.properties_out[t], and all the scenarios can be
+solved together as one block-diagonal NLP, or one at a time.
+
+The property packages are only built once, on the parent model, and shared by
+all the scenarios.
+
+Example:
+
+    points = [
+        {"flow_mol": 1, "temperature": 300, "pressure": 101325, "solids_fraction": 0.01,
+         "steam_flow_mol": 1, "steam_pressure": 101325, "steam_temperature": 300},
+        ...
+    ]
+    m = build_dsi_scenarios(points)
+    solve_scenarios(m)
+    df = dsi_scenario_results(m)
+"""
+import pandas as pd
+import pyomo.environ as pyo
+from idaes.core import FlowsheetBlock
+from idaes.core.util.model_statistics import degrees_of_freedom
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    AmountBasis,
+    PhaseType,
+    StateVars,
+)
+from idaes.models.properties.modular_properties import GenericParameterBlock
+import idaes.logger as idaeslog
+
+from direct_steam_injection import Dsi
+from translator import GenericTranslator
+from milk_config import milk_configuration
+
+_log = idaeslog.getLogger(__name__)
+
+
+def _add_property_packages(m, steam_state_vars=StateVars.PH):
+    m.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+        state_vars=steam_state_vars,
+    )
+    m.milk_properties = GenericParameterBlock(**milk_configuration)
+
+
+def _fix_milk_inlet(port, point):
+    port.flow_mol.fix(point["flow_mol"])
+    port.temperature.fix(point["temperature"])
+    port.pressure.fix(point["pressure"])
+    port.mole_frac_comp[0, "h2o"].fix(1 - point["solids_fraction"])
+    port.mole_frac_comp[0, "milk_solid"].fix(point["solids_fraction"])
+
+
+def build_dsi_scenarios(operating_points, **dsi_kwargs):
+    """
+    Build one Dsi flowsheet per operating point, all on the same model.
+
+    Each operating point is a dict with the inlet "flow_mol", "temperature", "pressure"
+    and "solids_fraction", the steam inlet "steam_pressure" and "steam_temperature",
+    and either "steam_flow_mol" or "outlet_temperature" (in which case the steam flow
+    is calculated).
+
+    Any extra keyword arguments are passed through to Dsi.
+    """
+    m = pyo.ConcreteModel()
+    m.scenarios = pyo.Set(initialize=range(len(operating_points)), ordered=True)
+    _add_property_packages(m)
+    m.fs = FlowsheetBlock(m.scenarios, dynamic=False)
+
+    for s, point in zip(m.scenarios, operating_points):
+        fs = m.fs[s]
+        fs.dsi = Dsi(
+            property_package=m.milk_properties,
+            steam_property_package=m.steam_properties,
+            **dsi_kwargs,
+        )
+        _fix_milk_inlet(fs.dsi.inlet, point)
+
+        fs.dsi.steam_inlet.pressure.fix(point["steam_pressure"])
+        fs.dsi.properties_steam_in[0].enth_mol.fix(
+            m.steam_properties.htpx(
+                p=point["steam_pressure"] * pyo.units.Pa,
+                T=point["steam_temperature"] * pyo.units.K,
+            )
+        )
+        if "outlet_temperature" in point:
+            # Initialise with a guess, then calculate the steam flow from the outlet temperature.
+            fs.dsi.steam_inlet.flow_mol[0].set_value(point.get("steam_flow_mol", 1))
+            fs.dsi.outlet.temperature.fix(point["outlet_temperature"])
+        else:
+            fs.dsi.steam_inlet.flow_mol.fix(point["steam_flow_mol"])
+    return m
+
+
+def build_translator_scenarios(operating_points):
+    """
+    Build one milk to helmholtz GenericTranslator per operating point, all on the same model.
+
+    Each operating point is a dict with the inlet "flow_mol", "temperature", "pressure"
+    and "solids_fraction".
+    """
+    m = pyo.ConcreteModel()
+    m.scenarios = pyo.Set(initialize=range(len(operating_points)), ordered=True)
+    _add_property_packages(m)
+    m.fs = FlowsheetBlock(m.scenarios, dynamic=False)
+
+    for s, point in zip(m.scenarios, operating_points):
+        fs = m.fs[s]
+        fs.translator = GenericTranslator(
+            inlet_property_package=m.milk_properties,
+            outlet_property_package=m.steam_properties,
+            outlet_state_defined=True,
+        )
+        _fix_milk_inlet(fs.translator.inlet, point)
+    return m
+
+
+def solve_scenarios(m, solver="ipopt", initialize=True, per_scenario=False, tee=False):
+    """
+    Initialise and solve all the scenarios on a model from build_dsi_scenarios
+    or build_translator_scenarios.
+
+    By default all the scenarios are solved as one block-diagonal NLP. With
+    per_scenario=True each scenario is solved on its own, so one infeasible operating
+    point doesn't stop the others from converging.
+
+    Returns a dict of scenario: termination condition.
+    """
+    assert degrees_of_freedom(m) == 0
+    opt = pyo.SolverFactory(solver)
+
+    if initialize:
+        for s in m.scenarios:
+            for unit in m.fs[s].component_data_objects(pyo.Block, descend_into=False):
+                if hasattr(unit, "initialize"):
+                    unit.initialize()
+
+    if not per_scenario:
+        results = opt.solve(m, tee=tee)
+        condition = results.solver.termination_condition
+        return {s: condition for s in m.scenarios}
+
+    status = {}
+    for s in m.scenarios:
+        results = opt.solve(m.fs[s], tee=tee)
+        status[s] = results.solver.termination_condition
+        if status[s] != pyo.TerminationCondition.optimal:
+            _log.warning(f"Scenario {s} finished with {status[s]}")
+    return status
+
+
+def dsi_scenario_results(m, time_point=0):
+    """
+    Collect the inlet specification and outlet state of every scenario in a model from
+    build_dsi_scenarios into a DataFrame (use .to_numpy() for an array).
+    """
+    rows = {}
+    for s in m.scenarios:
+        dsi = m.fs[s].dsi
+        rows[s] = {
+            "flow_mol": pyo.value(dsi.properties_milk_in[time_point].flow_mol),
+            "temperature": pyo.value(dsi.properties_milk_in[time_point].temperature),
+            "pressure": pyo.value(dsi.properties_milk_in[time_point].pressure),
+            "solids_fraction": pyo.value(
+                dsi.properties_milk_in[time_point].mole_frac_comp["milk_solid"]
+            ),
+            "steam_flow_mol": pyo.value(dsi.properties_steam_in[time_point].flow_mol),
+            "steam_pressure": pyo.value(dsi.properties_steam_in[time_point].pressure),
+            "outlet_flow_mol": pyo.value(dsi.properties_out[time_point].flow_mol),
+            "outlet_temperature": pyo.value(dsi.properties_out[time_point].temperature),
+            "outlet_enth_mol": pyo.value(dsi.properties_out[time_point].enth_mol),
+            "outlet_vapor_frac": pyo.value(
+                dsi.properties_out[time_point].phase_frac["Vap"]
+            ),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def translator_scenario_results(m, time_point=0):
+    """
+    Collect the outlet state of every scenario in a model from build_translator_scenarios
+    into a DataFrame.
+    """
+    rows = {}
+    for s in m.scenarios:
+        translator = m.fs[s].translator
+        rows[s] = {
+            "flow_mol": pyo.value(translator.properties_in[time_point].flow_mol),
+            "temperature": pyo.value(translator.properties_in[time_point].temperature),
+            "pressure": pyo.value(translator.properties_in[time_point].pressure),
+            "outlet_flow_mol": pyo.value(translator.properties_out[time_point].flow_mol),
+            "outlet_temperature": pyo.value(
+                translator.properties_out[time_point].temperature
+            ),
+            "outlet_enth_mol": pyo.value(translator.properties_out[time_point].enth_mol),
+            "outlet_vapor_frac": pyo.value(
+                translator.properties_out[time_point].vapor_frac
+            ),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
@@ -0,0 +1,526 @@
+"""
+Polynomial surrogate of the Dsi, for optimisation studies where the rigorous Dsi (five
+state blocks and the Helmholtz calls) dominates the solve time.
+
+The rigorous Dsi is sampled over its inputs (Latin hypercube, solved with
+dsi_cache.DsiEvaluator), and polynomials are fitted by least squares for:
+ - outlet_temperature, from the inlet temperature, pressure, solids fraction, steam
+   enthalpy and steam ratio (steam flow / inlet flow)
+ - steam_ratio, from the same inputs with the outlet temperature instead, which is used to
+   initialise the DsiSurrogate when the outlet temperature is the specification.
+The outlet temperature only depends on the inlet flow through the steam ratio, and on the
+steam pressure through its enthalpy, so those aren't inputs of the fits.
+
+DsiSurrogate has the same inlet, steam_inlet and outlet ports as Dsi, with only three state
+blocks, and an algebraic outlet temperature. The outlet phase split comes from the outlet
+state block's phase equilibrium, so it isn't fitted.
+
+Usage:
+
+    samples = sample_dsi(400)
+    surrogate = fit_surrogate(samples, degree=3)
+    save_surrogate(surrogate, "dsi_surrogate.json")
+    print(accuracy_report(surrogate, sample_dsi(100, seed=1)))  # held out solves
+
+    m.fs.dsi = DsiSurrogate(
+        property_package=m.fs.milk_properties,
+        steam_property_package=m.fs.steam_properties,
+        surrogate="dsi_surrogate.json",
+    )
+
+or python dsi_surrogate.py to sample, fit, save and report.
+"""
+import argparse
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import Suffix, value, check_optimal_termination, units as pyunits
+from pyomo.common.config import ConfigBlock, ConfigValue, In
+from idaes.core import (
+    declare_process_block_class,
+    UnitModelBlockData,
+    useDefault,
+)
+from idaes.core.util.config import is_physical_parameter_block
+from idaes.core.util.exceptions import ConfigurationError
+from idaes.core.util.model_statistics import degrees_of_freedom
+from idaes.core.util.tables import create_stream_table_dataframe
+from idaes.core.solvers import get_solver
+import idaes.logger as idaeslog
+
+_log = idaeslog.getLogger(__name__)
+
+DEFAULT_SURROGATE = "dsi_surrogate.json"
+
+# Sampling ranges. Steam temperatures are above saturation over the whole pressure range.
+DEFAULT_BOUNDS = {
+    "flow_mol": (1, 100),
+    "temperature": (280, 360),
+    "pressure": (80_000, 200_000),
+    "solids_fraction": (0, 0.1),
+    "steam_pressure": (200_000, 1_200_000),
+    "steam_temperature": (465, 500),
+    "steam_ratio": (0, 0.15),
+}
+
+FORWARD_INPUTS = ("temperature", "pressure", "solids_fraction", "steam_enth_mol", "steam_ratio")
+INVERSE_INPUTS = (
+    "temperature",
+    "pressure",
+    "solids_fraction",
+    "steam_enth_mol",
+    "outlet_temperature",
+)
+OUTPUTS = {
+    "outlet_temperature": FORWARD_INPUTS,
+    "steam_ratio": INVERSE_INPUTS,
+}
+
+
+def latin_hypercube(n, bounds, seed=0):
+    """
+    n points spread over bounds ({name: (low, high)}), as a dict of arrays.
+    """
+    rng = np.random.default_rng(seed)
+    points = {}
+    for name, (low, high) in bounds.items():
+        strata = (rng.permutation(n) + rng.random(n)) / n
+        points[name] = low + strata * (high - low)
+    return points
+
+
+def sample_dsi(n, bounds=None, seed=0, evaluator=None):
+    """
+    Solve the rigorous Dsi at n sample points, returning a DataFrame of the inputs and
+    results. Points that don't converge are dropped (with a warning).
+    """
+    from dsi_cache import DsiEvaluator
+
+    evaluator = evaluator or DsiEvaluator()
+    points = latin_hypercube(n, dict(DEFAULT_BOUNDS, **(bounds or {})), seed)
+    rows = []
+    for i in range(n):
+        point = {name: float(values[i]) for name, values in points.items()}
+        inputs = {k: v for k, v in point.items() if k != "steam_ratio"}
+        inputs["steam_flow_mol"] = point["steam_ratio"] * point["flow_mol"]
+        result = evaluator.solve(**inputs)
+        if not result["converged"]:
+            _log.warning(f"Sample {point} didn't converge, skipping it")
+            continue
+        point.update(
+            {
+                "steam_enth_mol": value(
+                    evaluator.model.fs.dsi.properties_steam_in[0].enth_mol
+                ),
+                "outlet_temperature": result["outlet"]["temperature"],
+            }
+        )
+        rows.append(point)
+    return pd.DataFrame(rows)
+
+
+def _exponents(n_inputs, degree):
+    return [
+        e
+        for e in itertools.product(range(degree + 1), repeat=n_inputs)
+        if sum(e) <= degree
+    ]
+
+
+def _scaled(fit, values):
+    """
+    Inputs scaled to [-1, 1] over the fitted range. Works on arrays or Pyomo expressions.
+    """
+    return [
+        2 * (values[name] - low) / (high - low) - 1
+        for name, low, high in zip(fit["inputs"], fit["lower"], fit["upper"])
+    ]
+
+
+def _terms(fit, values):
+    s = _scaled(fit, values)
+    terms = []
+    for e in fit["exponents"]:
+        term = 1
+        for si, ei in zip(s, e):
+            if ei:
+                term = term * si**ei
+        terms.append(term)
+    return terms
+
+
+def evaluate_fit(fit, values):
+    """
+    Evaluate a fitted polynomial, with values a dict of input name: array (or Pyomo
+    expression, in which case a Pyomo expression is returned).
+    """
+    return sum(float(c) * t for c, t in zip(fit["coeffs"], _terms(fit, values)))
+
+
+def fit_surrogate(samples, degree=3):
+    """
+    Least squares polynomial fits of OUTPUTS to the samples from sample_dsi.
+    """
+    surrogate = {"degree": degree}
+    for output, inputs in OUTPUTS.items():
+        fit = {
+            "inputs": list(inputs),
+            "lower": [float(samples[name].min()) for name in inputs],
+            "upper": [float(samples[name].max()) for name in inputs],
+            "exponents": _exponents(len(inputs), degree),
+        }
+        values = {name: samples[name].to_numpy() for name in inputs}
+        A = np.column_stack(
+            [np.broadcast_to(t, len(samples)) for t in _terms(fit, values)]
+        )
+        coeffs, *_ = np.linalg.lstsq(A, samples[output].to_numpy(), rcond=None)
+        fit["coeffs"] = [float(c) for c in coeffs]
+        surrogate[output] = fit
+    return surrogate
+
+
+def save_surrogate(surrogate, fname=DEFAULT_SURROGATE):
+    with open(fname, "w") as f:
+        json.dump(surrogate, f)
+
+
+def load_surrogate(fname=DEFAULT_SURROGATE):
+    with open(fname) as f:
+        return json.load(f)
+
+
+def accuracy_report(surrogate, samples):
+    """
+    Errors of the surrogate on (held out) samples from sample_dsi, for each output.
+    """
+    rows = {}
+    for output, inputs in OUTPUTS.items():
+        actual = samples[output].to_numpy()
+        predicted = evaluate_fit(
+            surrogate[output], {name: samples[name].to_numpy() for name in inputs}
+        )
+        error = predicted - actual
+        ss_tot = np.sum((actual - actual.mean()) ** 2)
+        rows[output] = {
+            "mean_abs_error": float(np.mean(np.abs(error))),
+            "max_abs_error": float(np.max(np.abs(error))),
+            "rmse": float(np.sqrt(np.mean(error**2))),
+            "r2": float(1 - np.sum(error**2) / ss_tot) if ss_tot > 0 else float("nan"),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _surrogate_domain(val):
+    """
+    Config domain for the surrogate: a path to a saved surrogate, or the dict itself.
+    """
+    if val is None or isinstance(val, dict):
+        return val
+    return str(val)
+
+
+@declare_process_block_class("DsiSurrogate")
+class DsiSurrogateData(UnitModelBlockData):
+    """
+    Direct Steam Injection surrogate
+
+    Same ports and specifications as the Dsi (fix the steam flow, or the outlet temperature
+    to calculate the steam flow), but the outlet temperature comes from a fitted polynomial
+    (see fit_surrogate) rather than from energy balances over intermediate state blocks.
+    Only valid within the range the surrogate was fitted over.
+    """
+
+    CONFIG = ConfigBlock()
+
+    CONFIG.declare(
+        "dynamic",
+        ConfigValue(
+            domain=In([False]),
+            default=False,
+            description="Dynamic model flag - must be False",
+            doc="""Indicates whether this model will be dynamic or not,
+    **default** = False. The DsiSurrogate does not support dynamic
+    behavior, thus this must be False.""",
+        ),
+    )
+    CONFIG.declare(
+        "has_holdup",
+        ConfigValue(
+            default=False,
+            domain=In([False]),
+            description="Holdup construction flag - must be False",
+            doc="""Indicates whether holdup terms should be constructed or not.
+    **default** - False. The DsiSurrogate does not have defined volume, thus
+    this must be False.""",
+        ),
+    )
+    CONFIG.declare(
+        "property_package",
+        ConfigValue(
+            default=useDefault,
+            domain=is_physical_parameter_block,
+            description="Property package to use for control volume",
+            doc="""Property parameter object used to define property calculations,
+    **default** - useDefault.
+    **Valid values:** {
+    **useDefault** - use default package from parent model or flowsheet,
+    **PhysicalParameterObject** - a PhysicalParameterBlock object.}""",
+        ),
+    )
+    CONFIG.declare(
+        "property_package_args",
+        ConfigBlock(
+            implicit=True,
+            description="Arguments to use for constructing property packages",
+            doc="""A ConfigBlock with arguments to be passed to a property block(s)
+    and used when constructing these,
+    **default** - None.
+    **Valid values:** {
+    see property package for documentation.}""",
+        ),
+    )
+    CONFIG.declare(
+        "steam_property_package",
+        ConfigValue(
+            default=useDefault,
+            domain=is_physical_parameter_block,
+            description="Property package to use for the steam inlet",
+            doc="""Property parameter object used to define property calculations,
+    **default** - useDefault.
+    **Valid values:** {
+    **useDefault** - use default package from parent model or flowsheet,
+    **PhysicalParameterObject** - a PhysicalParameterBlock object.}""",
+        ),
+    )
+    CONFIG.declare(
+        "steam_property_package_args",
+        ConfigBlock(
+            implicit=True,
+            description="Arguments to use for constructing property packages",
+            doc="""A ConfigBlock with arguments to be passed to a property block(s)
+    and used when constructing these,
+    **default** - None.
+    **Valid values:** {
+    see property package for documentation.}""",
+        ),
+    )
+    CONFIG.declare(
+        "surrogate",
+        ConfigValue(
+            default=DEFAULT_SURROGATE,
+            domain=_surrogate_domain,
+            description="Fitted surrogate to use",
+            doc="""Path to a surrogate saved with save_surrogate, or the dict from
+    fit_surrogate,
+    **default** - dsi_surrogate.json.""",
+        ),
+    )
+
+    def build(self):
+        super().build()
+
+        self.scaling_factor = Suffix(direction=Suffix.EXPORT)
+
+        surrogate = self.config.surrogate
+        if surrogate is None:
+            raise ConfigurationError(f"{self.name} needs a surrogate")
+        if not isinstance(surrogate, dict):
+            surrogate = load_surrogate(surrogate)
+        self._surrogate = surrogate
+
+        steam_components = self.config.steam_property_package.component_list
+        solids = [
+            c for c in self.config.property_package.component_list
+            if c not in steam_components
+        ]
+        if len(solids) != 1:
+            raise ConfigurationError(
+                f"{self.name} needs one component that is only in the inlet property package "
+                "(the solids), as the surrogate was fitted for."
+            )
+        self._solids = solids[0]
+
+        tmp_dict = dict(**self.config.property_package_args)
+        tmp_dict["parameters"] = self.config.property_package
+        tmp_dict["defined_state"] = True
+        self.properties_milk_in = self.config.property_package.state_block_class(
+            self.flowsheet().config.time, doc="Material properties of inlet", **tmp_dict
+        )
+        tmp_dict["defined_state"] = False
+        tmp_dict["has_phase_equilibrium"] = True
+        self.properties_out = self.config.property_package.state_block_class(
+            self.flowsheet().config.time, doc="Material properties of outlet", **tmp_dict
+        )
+        steam_dict = dict(**self.config.steam_property_package_args)
+        steam_dict["parameters"] = self.config.steam_property_package
+        steam_dict["defined_state"] = True
+        self.properties_steam_in = self.config.steam_property_package.state_block_class(
+            self.flowsheet().config.time,
+            doc="Material properties of steam inlet",
+            **steam_dict,
+        )
+
+        self.add_port(name="outlet", block=self.properties_out)
+        self.add_port(name="inlet", block=self.properties_milk_in, doc="Inlet port")
+        self.add_port(
+            name="steam_inlet", block=self.properties_steam_in, doc="Steam inlet port"
+        )
+
+        @self.Expression(self.flowsheet().time, doc="Steam flow / inlet flow")
+        def steam_ratio(b, t):
+            return b.properties_steam_in[t].flow_mol / b.properties_milk_in[t].flow_mol
+
+        @self.Constraint(self.flowsheet().time, doc="Surrogate outlet temperature")
+        def eq_outlet_temperature(b, t):
+            return b.properties_out[t].temperature == evaluate_fit(
+                surrogate["outlet_temperature"], b._surrogate_inputs(t)
+            ) * pyunits.K
+
+        @self.Constraint(self.flowsheet().time, doc="Pressure balance")
+        def eq_outlet_pressure(b, t):
+            return b.properties_out[t].pressure == b.properties_milk_in[t].pressure
+
+        @self.Constraint(
+            self.flowsheet().time,
+            self.config.property_package.component_list,
+            doc="Mass balance",
+        )
+        def eq_outlet_composition(b, t, c):
+            milk_in = b.properties_milk_in[t]
+            out = b.properties_out[t]
+            return out.flow_mol * out.mole_frac_comp[c] == milk_in.flow_mol * (
+                milk_in.mole_frac_comp[c]
+            ) + (b.properties_steam_in[t].flow_mol if c in steam_components else 0)
+
+    def _surrogate_inputs(self, t):
+        """
+        The surrogate inputs at time t, without units.
+        """
+        milk_in = self.properties_milk_in[t]
+        steam_in = self.properties_steam_in[t]
+        return {
+            "temperature": milk_in.temperature / pyunits.K,
+            "pressure": milk_in.pressure / pyunits.Pa,
+            "solids_fraction": milk_in.mole_frac_comp[self._solids],
+            "steam_enth_mol": steam_in.enth_mol / (pyunits.J / pyunits.mol),
+            "steam_ratio": self.steam_ratio[t],
+            "outlet_temperature": self.properties_out[t].temperature / pyunits.K,
+        }
+
+    def initialize(blk, state_args=None, outlvl=idaeslog.NOTSET, solver=None, optarg=None):
+        """
+        Initialise the DsiSurrogate: the outlet flow and composition come directly from the
+        inlets, the outlet temperature from the surrogate (or, if the outlet temperature is
+        fixed, the steam flow from the inverse fit), and then the unit is solved with the
+        inlets held.
+
+        Keyword Arguments:
+            state_args : not used, the inlet states are taken from the current values.
+            outlvl : sets output level of initialization routine
+            optarg : solver options dictionary object (default=None)
+            solver : str indicating which solver to use during initialization
+                (default = None, use default solver)
+
+        Returns:
+            None
+        """
+        init_log = idaeslog.getInitLogger(blk.name, outlvl, tag="unit")
+        solve_log = idaeslog.getSolveLogger(blk.name, outlvl, tag="unit")
+
+        steam_components = blk.config.steam_property_package.component_list
+        for t in blk.flowsheet().time:
+            milk_in = blk.properties_milk_in[t]
+            steam_in = blk.properties_steam_in[t]
+            out = blk.properties_out[t]
+            calc_steam_flow = out.temperature.fixed and not steam_in.flow_mol.fixed
+            # Only evaluate the known inputs, the other one may not have a value yet
+            unknown = "steam_ratio" if calc_steam_flow else "outlet_temperature"
+            inputs = {
+                k: value(v) for k, v in blk._surrogate_inputs(t).items() if k != unknown
+            }
+            if calc_steam_flow:
+                ratio = evaluate_fit(blk._surrogate["steam_ratio"], inputs)
+                steam_in.flow_mol.set_value(max(ratio, 0) * value(milk_in.flow_mol))
+            else:
+                out.temperature.set_value(
+                    evaluate_fit(blk._surrogate["outlet_temperature"], inputs)
+                )
+            flow_comp = {
+                c: value(milk_in.flow_mol * milk_in.mole_frac_comp[c])
+                + (value(steam_in.flow_mol) if c in steam_components else 0)
+                for c in blk.config.property_package.component_list
+            }
+            flow = sum(flow_comp.values())
+            out.flow_mol.set_value(flow)
+            out.pressure.set_value(value(milk_in.pressure))
+            for c, f in flow_comp.items():
+                out.mole_frac_comp[c].set_value(f / flow)
+
+        calc_steam_flow = [
+            t
+            for t in blk.flowsheet().time
+            if blk.properties_out[t].temperature.fixed
+            and not blk.properties_steam_in[t].flow_mol.fixed
+        ]
+        flags_milk = blk.properties_milk_in.initialize(
+            outlvl=outlvl, optarg=optarg, solver=solver, hold_state=True
+        )
+        flags_steam = blk.properties_steam_in.initialize(
+            outlvl=outlvl, optarg=optarg, solver=solver, hold_state=True
+        )
+        blk.properties_out.initialize(outlvl=outlvl, optarg=optarg, solver=solver)
+        init_log.info_high("Initialization Step 1 Complete.")
+
+        for t in calc_steam_flow:
+            blk.properties_steam_in[t].flow_mol.unfix()
+
+        if degrees_of_freedom(blk) == 0:
+            opt = get_solver(solver, optarg)
+            with idaeslog.solver_log(solve_log, idaeslog.DEBUG) as slc:
+                res = opt.solve(blk, tee=slc.tee)
+            init_log.info_high(
+                "Initialization Step 2 {}.".format(idaeslog.condition(res))
+            )
+            if not check_optimal_termination(res):
+                init_log.warning(
+                    f"{blk.name} failed to converge during initialization: "
+                    f"{idaeslog.condition(res)}"
+                )
+        else:
+            init_log.info_high(
+                "Initialization Step 2 skipped, unit is not square with the inlets held."
+            )
+
+        blk.properties_milk_in.release_state(flags_milk, outlvl=outlvl)
+        blk.properties_steam_in.release_state(flags_steam, outlvl=outlvl)
+        init_log.info("Initialization Complete.")
+
+    def _get_stream_table_contents(self, time_point=0):
+        return create_stream_table_dataframe(
+            {
+                "outlet": self.outlet,
+                "inlet": self.inlet,
+                "steam_inlet": self.steam_inlet,
+            },
+            time_point=time_point,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit a Dsi surrogate")
+    parser.add_argument("--samples", type=int, default=400)
+    parser.add_argument("--test-samples", type=int, default=100)
+    parser.add_argument("--degree", type=int, default=3)
+    parser.add_argument("--fname", default=DEFAULT_SURROGATE)
+    args = parser.parse_args()
+
+    train = sample_dsi(args.samples, seed=0)
+    surrogate = fit_surrogate(train, degree=args.degree)
+    save_surrogate(surrogate, args.fname)
+    print(f"Fitted on {len(train)} solves, saved to {args.fname}")
+
+    test = sample_dsi(args.test_samples, seed=1)
+    print(f"Accuracy on {len(test)} held out solves:")
+    print(accuracy_report(surrogate, test))
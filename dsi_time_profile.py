@@ -0,0 +1,98 @@
+"""
+Quasi-steady time profiles (e.g a day at hourly or 15 minute resolution) for a Dsi.
+
+The Dsi has no holdup, so every time point is independent, and a whole profile can be
+solved as one model by using a steady-state flowsheet with one time point per step.
+All the Dsi constraints are indexed by time point only, so the model (and its build time)
+grows linearly with the number of time points, and Dsi.initialize solves all the time
+points in one unit-level solve.
+
+Example:
+
+    profile = {
+        "flow_mol": [...],        # one value per time point
+        "temperature": [...],
+        "solids_fraction": [...],
+        "outlet_temperature": [...],
+    }
+    m = build_dsi_time_profile(range(24), profile, pressure=101325,
+                               steam_pressure=1e6, steam_temperature=458.15)
+    m.fs.dsi.initialize()
+    pyo.SolverFactory("ipopt").solve(m)
+    df = dsi_time_profile_results(m)
+"""
+import pandas as pd
+import pyomo.environ as pyo
+from idaes.core import FlowsheetBlock
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    AmountBasis,
+    PhaseType,
+)
+from idaes.models.properties.modular_properties import GenericParameterBlock
+
+from direct_steam_injection import Dsi
+from milk_config import milk_configuration
+
+
+def build_dsi_time_profile(
+    times, profile, pressure, steam_pressure, steam_temperature, **dsi_kwargs
+):
+    """
+    Build a Dsi over the time points times, specified by profile.
+
+    profile is a dict of lists (or a DataFrame) with a value for each time point, of
+    "flow_mol", "temperature" and "solids_fraction", and either "steam_flow_mol" or
+    "outlet_temperature". Inlet pressure and the steam conditions are constant.
+    """
+    times = list(times)
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False, time_set=times)
+    m.fs.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+    )
+    m.fs.milk_properties = GenericParameterBlock(**milk_configuration)
+    m.fs.dsi = Dsi(
+        property_package=m.fs.milk_properties,
+        steam_property_package=m.fs.steam_properties,
+        **dsi_kwargs,
+    )
+
+    steam_enth_mol = m.fs.steam_properties.htpx(
+        p=steam_pressure * pyo.units.Pa, T=steam_temperature * pyo.units.K
+    )
+    for i, t in enumerate(times):
+        m.fs.dsi.inlet.flow_mol[t].fix(profile["flow_mol"][i])
+        m.fs.dsi.inlet.temperature[t].fix(profile["temperature"][i])
+        m.fs.dsi.inlet.pressure[t].fix(pressure)
+        m.fs.dsi.inlet.mole_frac_comp[t, "h2o"].fix(1 - profile["solids_fraction"][i])
+        m.fs.dsi.inlet.mole_frac_comp[t, "milk_solid"].fix(profile["solids_fraction"][i])
+
+        m.fs.dsi.steam_inlet.pressure[t].fix(steam_pressure)
+        m.fs.dsi.properties_steam_in[t].enth_mol.fix(steam_enth_mol)
+        if "outlet_temperature" in profile:
+            m.fs.dsi.outlet.temperature[t].fix(profile["outlet_temperature"][i])
+        else:
+            m.fs.dsi.steam_inlet.flow_mol[t].fix(profile["steam_flow_mol"][i])
+    return m
+
+
+def dsi_time_profile_results(m):
+    """
+    The steam flow and outlet state at each time point, as a DataFrame indexed by time.
+    """
+    dsi = m.fs.dsi
+    return pd.DataFrame.from_dict(
+        {
+            t: {
+                "steam_flow_mol": pyo.value(dsi.properties_steam_in[t].flow_mol),
+                "outlet_flow_mol": pyo.value(dsi.properties_out[t].flow_mol),
+                "outlet_temperature": pyo.value(dsi.properties_out[t].temperature),
+                "outlet_vapor_frac": pyo.value(dsi.properties_out[t].phase_frac["Vap"]),
+            }
+            for t in m.fs.time
+        },
+        orient="index",
+    )
@@ -0,0 +1,89 @@
+"""
+The DSI -> flash -> evaporator effect flowsheet used in initialisation_experiment_evaporator.py,
+as functions so it can be rebuilt in other scripts (e.g sweep workers).
+"""
+import pyomo.environ as pyo
+from pyomo.network import Arc
+from idaes.core import FlowsheetBlock
+from idaes.models.unit_models import Heater, Valve, Separator
+from idaes.models.unit_models.separator import SplittingType
+from property_packages.build_package import build_package
+from direct_steam_injection import Dsi
+from parallel_initialization import initialize_in_order
+
+
+def build_flowsheet(**dsi_kwargs):
+    """
+    Build and specify the evaporator flowsheet (apart from the effect, see below).
+    Any keyword arguments are passed to Dsi.
+    """
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.steam_properties = build_package("helmholtz", ["water"], ["Vap", "Liq"])
+    m.fs.milk_properties = build_package("milk", ["water", "milk_solid"], ["Vap", "Liq"])
+
+    m.fs.dsi = Dsi(
+        property_package=m.fs.milk_properties,
+        steam_property_package=m.fs.steam_properties,
+        **dsi_kwargs,
+    )
+    m.fs.flash = Valve(
+        property_package=m.fs.milk_properties,
+    )
+    m.fs.flash_phase_separator = Separator(
+        property_package=m.fs.milk_properties,
+        split_basis=SplittingType.phaseFlow,
+    )
+    m.fs.effect_1 = Heater(
+        property_package=m.fs.milk_properties,
+        has_pressure_change=False,
+    )
+
+    # Link them up
+    m.fs.dsi_to_flash = Arc(source=m.fs.dsi.outlet, destination=m.fs.flash.inlet)
+    m.fs.flash_to_phase_separator = Arc(
+        source=m.fs.flash.outlet, destination=m.fs.flash_phase_separator.inlet
+    )
+    m.fs.flash_phase_separator_to_effect = Arc(
+        source=m.fs.flash_phase_separator.outlet_1,
+        destination=m.fs.effect_1.inlet,
+    )
+
+    pyo.TransformationFactory("network.expand_arcs").apply_to(m)
+
+    # Specify the properties
+    m.fs.dsi.inlet.flow_mol.fix(50)
+    m.fs.dsi.inlet.temperature.fix(351.15)  # 78.0 C
+    m.fs.dsi.inlet.pressure.fix(90000)  # 90 kPa
+    m.fs.dsi.inlet.mole_frac_comp[0, "water"].fix(0.95)
+    m.fs.dsi.inlet.mole_frac_comp[0, "milk_solid"].fix(0.05)
+
+    m.fs.dsi.steam_inlet.pressure.fix(1_000_000)  # 10 bar
+    m.fs.dsi.properties_steam_in[0].constrain_component(
+        m.fs.dsi.properties_steam_in[0].temperature, 458.15
+    )  # 185 C
+    m.fs.dsi.outlet.temperature.fix(368.15)  # 95 C, this is used to calculate the flowrate of the steam_inlet.
+
+    m.fs.flash.valve_opening.fix(1)
+
+    # Add a constraint to fix the outlet pressure of the flash, which should calculate the valve coefficient.
+    @m.fs.Constraint()
+    def flash_pressure_constraint(fs):
+        return fs.flash.outlet.pressure[0] == 75_000  # 75 kPa
+
+    m.fs.flash.Cv.unfix()  # IDK why this is fixed by default.
+
+    m.fs.flash_phase_separator.split_fraction[0, "outlet_1", "Vap"].fix(0.02)
+    m.fs.flash_phase_separator.split_fraction[0, "outlet_1", "Liq"].fix(0.99)
+
+    # Note the effect is left unspecified: fix either m.fs.effect_1.heat_duty
+    # or m.fs.effect_1.outlet.temperature before solving.
+    return m
+
+
+def initialize(m, verbose=False):
+    """
+    Initialise the flowsheet in sequential order. No tears are required.
+    The order is worked out on the first call and cached on the model.
+    """
+    initialize_in_order(m, verbose=verbose)
@@ -1,13 +1,4 @@
-from direct_steam_injection import Dsi
-import pytest
 import pyomo.environ as pyo
-from pyomo.network import Arc
-from idaes.core import FlowsheetBlock, MaterialBalanceType
-from idaes.models.unit_models import Heater, Valve
-from idaes.models.properties import iapws95
-from idaes.core.util.initialization import propagate_state
-from idaes.core.util.model_statistics import degrees_of_freedom
-from idaes.core.util import DiagnosticsToolbox
 from idaes.models.properties.general_helmholtz import (
         HelmholtzParameterBlock,
         HelmholtzThermoExpressions,
@@ -15,60 +6,32 @@ from idaes.models.properties.general_helmholtz import (
         PhaseType,
         StateVars
     )
-from idaes.models.properties.modular_properties import GenericParameterBlock
-from milk_config import milk_configuration
+from property_evaluator import milk_evaluator
 
 
+# HelmholtzThermoExpressions needs a parameter block on a model, but nothing else.
 m = pyo.ConcreteModel()
-m.fs = FlowsheetBlock(dynamic=False)
-m.fs.steam_properties = HelmholtzParameterBlock(
+m.steam_properties = HelmholtzParameterBlock(
         pure_component="h2o", amount_basis=AmountBasis.MOLE,
         phase_presentation=PhaseType.LG,
         state_vars= StateVars.PH
     )
-m.fs.milk_properties = GenericParameterBlock(**milk_configuration)
 
-m.fs.milk_sb = m.fs.milk_properties.build_state_block(
-    m.fs.time,
-    defined_state=True,
-    doc="Stateblock for the inlet stream",
-)
-m.fs.helm_sb = m.fs.steam_properties.build_state_block(
-    m.fs.time,
-    defined_state=True,
-    doc="Stateblock for the inlet stream",
-)
-
-# Make the milk sb pure water
-m.fs.milk_sb[0].mole_frac_comp["h2o"].fix(0.99999)
-m.fs.milk_sb[0].mole_frac_comp["milk_solid"].fix(0.00001)
-
-# Set flow
-m.fs.milk_sb[0].flow_mol.fix(1)
-m.fs.helm_sb[0].flow_mol.fix(1)
-
-opt = pyo.SolverFactory("ipopt")
+# No solves needed: the milk pp is evaluated on the whole grid at once with NumPy,
+# and the helmholtz pp properties are explicit functions of T and P.
+te = HelmholtzThermoExpressions(m, m.steam_properties)
 
 temperature = [280 + i for i in range(150)]
-enthalpy_helm = []
-enthalpy_milk = []
 
-# Set both stateblocks to the same temperature and pressure
-for temp in temperature:
-    m.fs.milk_sb[0].temperature.fix(temp * pyo.units.K)
-    m.fs.milk_sb[0].pressure.fix(101325)
-    m.fs.helm_sb[0].enth_mol.fix(
-        m.fs.steam_properties.htpx(p=101325 * pyo.units.Pa, T=temp * pyo.units.K)
-    )
-    m.fs.helm_sb[0].pressure.fix(101325)
-
-    assert degrees_of_freedom(m.fs) == 0
-
-    results = opt.solve(m, tee=False)
-    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
-
-    enthalpy_milk.append(pyo.value(m.fs.milk_sb[0].entr_mol))
-    enthalpy_helm.append(pyo.value(m.fs.helm_sb[0].entr_mol))
+# Pure water in the milk pp
+milk_props = milk_evaluator().evaluate(
+    temperature, 101325, {"h2o": 0.99999, "milk_solid": 0.00001}
+)
+enthalpy_milk = list(milk_props["entr_mol"])
+enthalpy_helm = [
+    pyo.value(te.s_mol(T=temp * pyo.units.K, p=101325 * pyo.units.Pa))
+    for temp in temperature
+]
 
 
 # Graph the results
@@ -1,194 +1,155 @@
-from direct_steam_injection import Dsi
-import pytest
-import pyomo.environ as pyo
-from pyomo.network import Arc
-from pyomo.network import SequentialDecomposition, Port
-from idaes.core import FlowsheetBlock, MaterialBalanceType
-from idaes.models.unit_models import Heater, Valve, Separator
-from idaes.models.properties import iapws95
-from idaes.core.util.initialization import propagate_state
 from idaes.core.util.model_statistics import degrees_of_freedom
-from idaes.core.util import DiagnosticsToolbox
-from idaes.models.unit_models.separator import SplittingType
-from property_packages.build_package import build_package
-from direct_steam_injection import Dsi
-from translator import GenericTranslator
-import idaes.logger as idaeslog
-from idaes.core.util.model_serializer import from_json, to_json
 import time
 # New solver interface: http://pyomo.readthedocs.io/en/6.8.0/developer_reference/solvers.html
-from pyomo.contrib.solver.util import assert_optimal_termination, SolutionStatus, TerminationCondition
 from pyomo.contrib.solver.ipopt import Ipopt
-
-# Build the model
-m = pyo.ConcreteModel()
-m.fs = FlowsheetBlock(dynamic=False)
-m.fs.steam_properties = build_package("helmholtz",["water"],["Vap","Liq"])
-m.fs.milk_properties = build_package("milk",["water","milk_solid"],["Vap","Liq"])
-
-
-m.fs.dsi = Dsi(
-    property_package=m.fs.milk_properties,
-    steam_property_package=m.fs.steam_properties
-)
-m.fs.flash = Valve(
-    property_package=m.fs.milk_properties,
-)
-m.fs.flash_phase_separator = Separator(
-    property_package=m.fs.milk_properties,
-    split_basis=SplittingType.phaseFlow
-)
-m.fs.effect_1 = Heater(
-    property_package=m.fs.milk_properties,
-    has_pressure_change=False,
-)
-# m.fs.effect_phase_separator = Separator(
-#     property_package=m.fs.properties,
-#     splitting_type=SplittingType.phaseFlow
-# )
-# m.fs.translator = GenericTranslator(
-#     inlet_property_package=m.fs.milk_properties,
-#     outlet_property_package=m.fs.steam_properties,
-# )
-
-# Link them up
-m.fs.dsi_to_flash = Arc(source=m.fs.dsi.outlet, destination=m.fs.flash.inlet)
-m.fs.flash_to_phase_separator = Arc(
-    source=m.fs.flash.outlet, destination=m.fs.flash_phase_separator.inlet
-)
-m.fs.flash_phase_separator_to_effect = Arc(
-    source=m.fs.flash_phase_separator.outlet_1,
-    destination=m.fs.effect_1.inlet,
-)
-# m.fs.effect_to_phase_separator = Arc(
-#     source=m.fs.effect_1.outlet, destination=m.fs.effect_phase_separator.inlet
-# )
-# m.fs.effect_phase_separator_to_translator = Arc(
-#     source=m.fs.effect_phase_separator.outlet_2,
-#     destination=m.fs.translator.inlet,
-# )
-
-pyo.TransformationFactory("network.expand_arcs").apply_to(m)
-
-
-
-
-
-# Specify the properties
-m.fs.dsi.inlet.flow_mol.fix(50)
-m.fs.dsi.inlet.temperature.fix(351.15) # 78.0 C
-m.fs.dsi.inlet.pressure.fix(90000) # 90 kPa
-m.fs.dsi.inlet.mole_frac_comp[0, "water"].fix(0.95)
-m.fs.dsi.inlet.mole_frac_comp[0, "milk_solid"].fix(0.05)
-
-m.fs.dsi.steam_inlet.pressure.fix(1_000_000) # 10 bar
-m.fs.dsi.properties_steam_in[0].constrain_component(m.fs.dsi.properties_steam_in[0].temperature, 458.15) # 185 C
-m.fs.dsi.outlet.temperature.fix(368.15) # 95 C, this is used to calculate the flowrate of the steam_inlet.
-
-m.fs.flash.valve_opening.fix(1)
-# Add a constraint to fix the outlet pressure of the flash, which should calculate the valve coefficient.
-@m.fs.Constraint()
-def flash_pressure_constraint(fs):
-    return fs.flash.outlet.pressure[0] == 75_000 # 75 kPa
-m.fs.flash.Cv.unfix() # IDK why this is fixed by default.
-
-m.fs.flash_phase_separator.split_fraction[0,"outlet_1", "Vap"].fix(0.02)
-m.fs.flash_phase_separator.split_fraction[0,"outlet_1", "Liq"].fix(0.99)
-
-
-default_values = to_json(m,return_dict=True)
+from evaporator_flowsheet import build_flowsheet, initialize
+from sweep import run_sweep
+from state_snapshot import SnapshotIndex
+from solve_driver import SolveDriver
+from continuation import continuation
+from decomposition_solve import solve_decomposed
 
 
 HEAT_DUTY_VALUES = [0,1000,2000, 4000, 8000, 12000, 16000, 20000, 30000,60000]
 TEMPERATURE_VALUES = [351.15, 353.15, 355.15, 357.15, 359.15, 361.15, 363.15, 365.15, 330.15,375.15]
-time_results = []
-iteration_results = []
-solve_status = []
-indexes = []
-
-global start
-global end
-
 
 
-def setup():
-    global start
-    start = time.time()
-
-def restore():
-    from_json(m,sd=default_values)
-
-
-def initialize():
-    def init_unit(unit):
-        print(f"Initializing unit {unit}")
-        unit.initialize()#outlvl=idaeslog.DEBUG
-
-    # Use SequentialDecomposition to initialise the model
-    seq = SequentialDecomposition()
-    # use create_graph to get the order of sequential decomposition, and also to
-    # find any units that are not connected to the sequential decomposition
-    seq.set_tear_set([]) # No tears required.
-    G = seq.create_graph(m)
-    order = seq.calculation_order(G)
-    seq_blocks = []
-    for o in order:
-        seq_blocks.append(o[0])
-    print("Order of initialisation:", [blk.name for blk in seq_blocks])
-    seq.options["tol"] = 1e-2
-    # seq.options["solve_tears"] = False
-    res = seq.run(m, init_unit)
-
-def solve():
+def solve(m):
     assert degrees_of_freedom(m) == 0
     opt = Ipopt()
     opt.config.raise_exception_on_nonoptimal_result = False
-    status = opt.solve(m, tee=False)
-    global end
-    global start
-    end = time.time()
-    time_results.append(end - start)
-    iteration_results.append(status.iteration_count)
-    solve_status.append(status.solution_status) 
-
-for heat_duty in HEAT_DUTY_VALUES:
-    restore()
-    setup()
-    m.fs.effect_1.heat_duty.fix(heat_duty)
-    initialize()
-    solve()
-    indexes.append("heat duty of " + str(heat_duty) + " with initialisation")
+    return opt.solve(m, tee=False)
 
-for heat_duty in HEAT_DUTY_VALUES:
-    setup()
+
+# Cases for the parallel sweep. These start from the freshly built model.
+def heat_duty_case(m, heat_duty):
     m.fs.effect_1.heat_duty.fix(heat_duty)
-    solve()
-    indexes.append("heat duty of " + str(heat_duty) + " from previous solve")
+    initialize(m)
+    return solve(m)
 
-m.fs.effect_1.heat_duty.unfix()
 
-for temperature in TEMPERATURE_VALUES:
-    setup()
+def temperature_case(m, temperature):
+    m.fs.effect_1.heat_duty.unfix()
     m.fs.effect_1.outlet.temperature.fix(temperature)
-    solve()
-    indexes.append("temperature of " + str(temperature) +  " from previous solve")
+    initialize(m)
+    return solve(m)
 
 
-for temperature in TEMPERATURE_VALUES:
-    restore()
-    setup()
+# Same as temperature_case, but failing solves are cut short and retried with the
+# fallback strategies in solve_driver.py (e.g solving for the heat duty first).
+def temperature_case_fallback(m, temperature):
+    m.fs.effect_1.heat_duty.unfix()
     m.fs.effect_1.outlet.temperature.fix(temperature)
-    initialize()
-    solve()
-    indexes.append("temperature of " + str(temperature) + " with initialisation")
-
-
-
-for results in zip(indexes, time_results, iteration_results, solve_status):
-    print(results)
+    initialize(m)
+    driver = SolveDriver(
+        m, spec_swaps=[(m.fs.effect_1.outlet.temperature[0], m.fs.effect_1.heat_duty[0])]
+    )
+    result = driver.solve()
+    del result["attempts"]
+    return result
+
+
+if __name__ == "__main__":
+    # Build the model
+    m = build_flowsheet()
+    snapshot_index = SnapshotIndex(m)
+    default_values = snapshot_index.take()
+
+    time_results = []
+    iteration_results = []
+    solve_status = []
+    indexes = []
+
+    def restore():
+        snapshot_index.restore(default_values)
+
+    def run(label, start):
+        status = solve(m)
+        end = time.time()
+        time_results.append(end - start)
+        iteration_results.append(status.iteration_count)
+        solve_status.append(status.solution_status)
+        indexes.append(label)
+
+    for heat_duty in HEAT_DUTY_VALUES:
+        restore()
+        start = time.time()
+        m.fs.effect_1.heat_duty.fix(heat_duty)
+        initialize(m, verbose=True)
+        run("heat duty of " + str(heat_duty) + " with initialisation", start)
+
+    for heat_duty in HEAT_DUTY_VALUES:
+        start = time.time()
+        m.fs.effect_1.heat_duty.fix(heat_duty)
+        run("heat duty of " + str(heat_duty) + " from previous solve", start)
+
+    m.fs.effect_1.heat_duty.unfix()
+
+    for temperature in TEMPERATURE_VALUES:
+        start = time.time()
+        m.fs.effect_1.outlet.temperature.fix(temperature)
+        run("temperature of " + str(temperature) +  " from previous solve", start)
+
+    # The same jumps again, walked in adaptive steps from the previous solution
+    for temperature in TEMPERATURE_VALUES:
+        result = continuation(
+            m, {m.fs.effect_1.outlet.temperature[0]: temperature}, index=snapshot_index
+        )
+        time_results.append(result["time"])
+        iteration_results.append(result["iterations"])
+        solve_status.append(f"converged in {result['steps']} steps" if result["converged"] else "failed")
+        indexes.append("temperature of " + str(temperature) + " by continuation")
+
+    for temperature in TEMPERATURE_VALUES:
+        restore()
+        start = time.time()
+        m.fs.effect_1.outlet.temperature.fix(temperature)
+        initialize(m, verbose=True)
+        run("temperature of " + str(temperature) + " with initialisation", start)
+
+    # The heat duty cases again, with initialisation, solved by the decomposition
+    # (simulation only). This comes after all the baseline loops so their starting points
+    # are unchanged. The decomposition has no Ipopt iteration count to compare (only if
+    # it falls back to Ipopt), so the number of blocks is reported in the status instead.
+    for heat_duty in HEAT_DUTY_VALUES:
+        restore()
+        start = time.time()
+        m.fs.effect_1.heat_duty.fix(heat_duty)
+        initialize(m)
+        result = solve_decomposed(m, index=snapshot_index)
+        time_results.append(time.time() - start)
+        iteration_results.append(result["iterations"])
+        solve_status.append(
+            f"{result['method']} {'converged' if result['converged'] else 'failed'}, "
+            f"{result['blocks']} blocks"
+        )
+        indexes.append("heat duty of " + str(heat_duty) + " by decomposition")
+
+    for results in zip(indexes, time_results, iteration_results, solve_status):
+        print(results)
+
+    # The "with initialisation" cases are independent, so they can also be run in parallel.
+    start = time.time()
+    heat_duty_results = run_sweep(
+        build_flowsheet, heat_duty_case, [{"heat_duty": q} for q in HEAT_DUTY_VALUES]
+    )
+    temperature_results = run_sweep(
+        build_flowsheet, temperature_case, [{"temperature": t} for t in TEMPERATURE_VALUES]
+    )
+    fallback_results = run_sweep(
+        build_flowsheet,
+        temperature_case_fallback,
+        [{"temperature": t} for t in TEMPERATURE_VALUES],
+    )
+    print(heat_duty_results)
+    print(temperature_results)
+    print(fallback_results)
+    print("Parallel sweep wall time:", time.time() - start)
 
 
 # RESULTS:
+# These are the baseline loops only (with initialisation and from previous solve). The
+# continuation, decomposition and parallel sweep results haven't been recorded here yet.
 # ('heat duty of 0 with initialisation', 1.0205872058868408, 54, <SolutionStatus.optimal: 30>)
 # ('heat duty of 1000 with initialisation', 0.95733642578125, 41, <SolutionStatus.optimal: 30>)
 # ('heat duty of 2000 with initialisation', 0.9359180927276611, 45, <SolutionStatus.optimal: 30>)
@@ -0,0 +1,168 @@
+"""
+Structural analysis of the Jacobian of a Dsi (or any square) flowsheet, to see what the
+linear solver (MA27/MUMPS) has to factorise.
+
+structure_report gives:
+ - the size and number of nonzeros of the Jacobian of the active equality constraints
+   with respect to the unfixed variables,
+ - the block triangular decomposition (if the system is square and structurally
+   nonsingular): number of blocks and the largest ones, i.e the parts that have to be
+   solved simultaneously,
+ - a fill-in estimate: the nonzeros of a sparse LU (COLAMD ordering) of a matrix with the
+   Jacobian's sparsity pattern, relative to the Jacobian itself,
+ - the constraints with the most variables,
+ - for a unit, the coupling between its internal blocks: how many Jacobian entries
+   connect constraints in one block (e.g properties_out) to variables in another.
+
+The default Dsi energy balance divides steam_delta_h by properties_mixed_unheated.flow_mol;
+Dsi(multiply_energy_balance=True) writes it multiplied through by the flow instead. Both
+have the same sparsity pattern (the same variables appear in the balance either way), so
+their reports only differ in the fill-in estimate: 2.92 x nnz multiplied through against
+2.59 for the default on the benchmarks.py Dsi. That estimate is an LU with random values,
+so it also depends on the pivots, not just the pattern.
+
+Usage:
+
+    python jacobian_structure.py      # compare the Dsi formulations from benchmarks.py
+
+    report = structure_report(m, unit=m.fs.dsi)
+    print_structure_report(report)
+"""
+from collections import Counter
+
+import numpy as np
+from pyomo.contrib.incidence_analysis import IncidenceGraphInterface
+
+
+def _owner(component, unit):
+    """
+    Name of the direct child block of unit that component is in, or "unit" if it is
+    declared on the unit itself, or "outside" if it isn't in the unit.
+    """
+    block = component.parent_block()
+    child = None
+    while block is not None and block is not unit:
+        child = block
+        block = block.parent_block()
+    if block is None:
+        return "outside"
+    if child is None:
+        return "unit"
+    return child.parent_component().local_name
+
+
+def fill_in_estimate(matrix):
+    """
+    nnz(L) + nnz(U) of a sparse LU of a matrix with the sparsity pattern of matrix, divided
+    by nnz(matrix), or None if the LU fails. The values are random, so this is only about
+    the structure.
+    """
+    from scipy.sparse import csc_matrix
+    from scipy.sparse.linalg import splu
+
+    rng = np.random.default_rng(0)
+    pattern = csc_matrix(
+        (rng.uniform(1, 2, matrix.nnz), (matrix.row, matrix.col)), shape=matrix.shape
+    )
+    try:
+        lu = splu(pattern, permc_spec="COLAMD")
+    except RuntimeError:  # numerically singular by bad luck
+        return None
+    return (lu.L.nnz + lu.U.nnz) / matrix.nnz
+
+
+def structure_report(m, unit=None, n_largest=5):
+    """
+    Structural information about the active equality constraints of m (see the module
+    docstring). If unit is given, the coupling between its internal blocks is included.
+    """
+    igraph = IncidenceGraphInterface(m, include_inequality=False)
+    variables = igraph.variables
+    constraints = igraph.constraints
+    matrix = igraph.incidence_matrix.tocoo()
+
+    report = {
+        "variables": len(variables),
+        "constraints": len(constraints),
+        "nonzeros": int(matrix.nnz),
+        "density": matrix.nnz / max(len(variables) * len(constraints), 1),
+    }
+
+    row_counts = np.bincount(matrix.row, minlength=len(constraints))
+    densest = np.argsort(row_counts)[::-1][:n_largest]
+    report["densest_constraints"] = [
+        (constraints[i].name, int(row_counts[i])) for i in densest
+    ]
+
+    square = len(variables) == len(constraints)
+    matching = igraph.maximum_matching() if square else {}
+    report["structurally_nonsingular"] = square and len(matching) == len(constraints)
+    if report["structurally_nonsingular"]:
+        var_blocks, con_blocks = igraph.block_triangularize()
+        sizes = sorted((len(b) for b in var_blocks), reverse=True)
+        report["blocks"] = len(var_blocks)
+        report["largest_blocks"] = sizes[:n_largest]
+        report["variables_in_largest_block"] = [
+            v.name for v in max(var_blocks, key=len)
+        ]
+        report["fill_in"] = fill_in_estimate(matrix)
+    else:
+        dm_vars, dm_cons = igraph.dulmage_mendelsohn()
+        report["underconstrained_variables"] = len(dm_vars.unmatched) + len(
+            dm_vars.underconstrained
+        )
+        report["overconstrained_constraints"] = len(dm_cons.unmatched) + len(
+            dm_cons.overconstrained
+        )
+
+    if unit is not None:
+        con_owner = [_owner(c, unit) for c in constraints]
+        var_owner = [_owner(v, unit) for v in variables]
+        coupling = Counter(
+            (con_owner[i], var_owner[j])
+            for i, j in zip(matrix.row, matrix.col)
+            if con_owner[i] != "outside" and con_owner[i] != var_owner[j]
+        )
+        report["coupling"] = dict(coupling.most_common())
+    return report
+
+
+def print_structure_report(report):
+    print(
+        f"{report['constraints']} constraints x {report['variables']} variables, "
+        f"{report['nonzeros']} nonzeros (density {report['density']:.2e})"
+    )
+    if report["structurally_nonsingular"]:
+        print(
+            f"Block triangular form: {report['blocks']} blocks, largest "
+            f"{report['largest_blocks']}"
+        )
+        if report["fill_in"] is not None:
+            print(f"LU fill-in estimate: {report['fill_in']:.2f} x nnz")
+    else:
+        print(
+            "Not square/structurally singular: "
+            f"{report['underconstrained_variables']} underconstrained variables, "
+            f"{report['overconstrained_constraints']} overconstrained constraints"
+        )
+    print("Densest constraints:")
+    for name, count in report["densest_constraints"]:
+        print(f"  {count:>4}  {name}")
+    if "coupling" in report:
+        print("Coupling between blocks (constraint block -> variable block: entries):")
+        for (con_block, var_block), count in report["coupling"].items():
+            print(f"  {con_block} -> {var_block}: {count}")
+
+
+if __name__ == "__main__":
+    from benchmarks import build_dsi
+
+    for label, kwargs in (
+        ("default", {}),
+        ("multiply_energy_balance", {"multiply_energy_balance": True}),
+        ("reduced_mixing", {"reduced_mixing": True}),
+    ):
+        m = build_dsi(temperature=320, steam_flow_mol=0.5, **kwargs)
+        print(f"--- Dsi {label} ---")
+        print_structure_report(structure_report(m, unit=m.fs.dsi))
+        print()
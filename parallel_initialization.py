@@ -0,0 +1,191 @@
+"""
+Initialisation scheduler for flowsheets with independent branches (e.g several Dsi trains).
+
+SequentialDecomposition recomputes the unit graph every run and initialises every unit
+one after another. This works out the unit dependency graph (from the Arcs) once, caches
+it on the model, and groups the units into levels: every unit in a level only depends on
+units in earlier levels. The units in a level are independent, so with an
+InitializationScheduler they are initialised at the same time in worker processes (each
+with its own copy of the flowsheet, built by the same builder function as in sweep.py),
+and the converged unit states are copied back. Levels with one unit are initialised in
+the main process. After each level the outlet states are propagated along the arcs.
+
+There are no tears, so the flowsheet must not have recycles.
+
+Example:
+
+    m = build_flowsheet()
+    with InitializationScheduler(build_flowsheet) as scheduler:
+        scheduler.initialize(m)
+
+    # Or without worker processes
+    initialize_in_order(m)
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import pyomo.environ as pyo
+from pyomo.network import Arc
+from idaes.core import UnitModelBlockData
+from idaes.core.util.initialization import propagate_state
+import idaes.logger as idaeslog
+
+from state_snapshot import SnapshotIndex
+
+_log = idaeslog.getLogger(__name__)
+
+
+def _units(m):
+    return [
+        b
+        for b in m.component_data_objects(pyo.Block, descend_into=True)
+        if isinstance(b, UnitModelBlockData) and hasattr(b, "initialize")
+    ]
+
+
+def _unit_of(port, units):
+    block = port.parent_block()
+    while block is not None and id(block) not in units:
+        block = block.parent_block()
+    return block
+
+
+def initialization_schedule(m):
+    """
+    The units of m grouped into levels that can be initialised in order, and the arcs
+    leaving each unit, as component names. Cached on the model, and worked out again if
+    the arcs change.
+    """
+    arcs = list(m.component_data_objects(Arc, descend_into=True, sort=True))
+    signature = tuple(arc.name for arc in arcs)
+    cached = getattr(m, "_initialization_schedule", None)
+    if cached is not None and cached["signature"] == signature:
+        return cached
+
+    units = {id(u): u for u in _units(m)}
+    depends_on = {u.name: set() for u in units.values()}
+    arcs_from = {u.name: [] for u in units.values()}
+    for arc in arcs:
+        source = _unit_of(arc.source, units)
+        destination = _unit_of(arc.destination, units)
+        if source is None or destination is None:
+            continue
+        depends_on[destination.name].add(source.name)
+        arcs_from[source.name].append(arc.name)
+
+    levels = []
+    done = set()
+    while len(done) < len(depends_on):
+        level = sorted(
+            name for name, deps in depends_on.items() if name not in done and deps <= done
+        )
+        if not level:
+            raise ValueError(
+                "The flowsheet has a recycle, use SequentialDecomposition with tears"
+            )
+        levels.append(level)
+        done.update(level)
+
+    schedule = {"signature": signature, "levels": levels, "arcs_from": arcs_from}
+    # Plain attribute, not a Pyomo component
+    m._initialization_schedule = schedule
+    return schedule
+
+
+def _propagate(m, schedule, unit_names):
+    for name in unit_names:
+        for arc_name in schedule["arcs_from"][name]:
+            propagate_state(arc=m.find_component(arc_name))
+
+
+def initialize_in_order(m, verbose=False, **init_kwargs):
+    """
+    Initialise the units of m one by one, in the cached order.
+    """
+    schedule = initialization_schedule(m)
+    for level in schedule["levels"]:
+        for name in level:
+            if verbose:
+                print(f"Initializing unit {name}")
+            m.find_component(name).initialize(**init_kwargs)
+        _propagate(m, schedule, level)
+
+
+# Per-process state, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(builder, builder_kwargs):
+    _worker["model"] = builder(**builder_kwargs)
+    _worker["indexes"] = {}
+
+
+def _initialize_unit(name, snapshot, init_kwargs):
+    """
+    Initialise the unit name of the worker's model, starting from snapshot (the unit's
+    variable values and fixed flags in the main process), and return its new snapshot.
+    """
+    m = _worker["model"]
+    if name not in _worker["indexes"]:
+        _worker["indexes"][name] = SnapshotIndex(m.find_component(name))
+    index = _worker["indexes"][name]
+    index.restore(snapshot)
+    m.find_component(name).initialize(**init_kwargs)
+    return index.take()
+
+
+class InitializationScheduler:
+    """
+    Initialises independent units of flowsheets built by builder in worker processes.
+
+    Args:
+        builder: function returning the flowsheet (the same structure as the models that
+            will be initialised). Called once per worker, so it must be importable.
+        builder_kwargs: keyword arguments for builder.
+        max_workers: number of worker processes, defaults to the number of cores.
+    """
+
+    def __init__(self, builder, builder_kwargs=None, max_workers=None):
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(builder, builder_kwargs or {}),
+        )
+        self._indexes = {}
+
+    def _index(self, unit):
+        key = (id(unit), unit.name)
+        if key not in self._indexes:
+            self._indexes[key] = SnapshotIndex(unit)
+        return self._indexes[key]
+
+    def initialize(self, m, verbose=False, **init_kwargs):
+        """
+        Initialise the units of m, level by level, running the units of each level in
+        parallel.
+        """
+        schedule = initialization_schedule(m)
+        for level in schedule["levels"]:
+            if verbose:
+                print("Initializing units", level)
+            if len(level) == 1:
+                m.find_component(level[0]).initialize(**init_kwargs)
+            else:
+                units = [m.find_component(name) for name in level]
+                futures = [
+                    self.executor.submit(
+                        _initialize_unit, name, self._index(unit).take(), init_kwargs
+                    )
+                    for name, unit in zip(level, units)
+                ]
+                for unit, future in zip(units, futures):
+                    self._index(unit).restore(future.result())
+            _propagate(m, schedule, level)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,74 @@
+"""
+Cached construction of the property parameter blocks.
+
+Building GenericParameterBlock(**milk_configuration) processes the whole configuration
+dict (components, phases, units and parameters) every time. This builds each parameter
+block once per process, on a template model, and then hands out clones of it, which
+only have to copy the already constructed components.
+
+Example:
+
+    m.fs.milk_properties = cached_parameter_block("milk")
+    m.fs.steam_properties = cached_parameter_block("helmholtz")
+
+See benchmark_property_cache.py for the start-up time comparison.
+"""
+import pyomo.environ as pyo
+from idaes.models.properties.modular_properties import GenericParameterBlock
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    AmountBasis,
+    PhaseType,
+    StateVars,
+)
+
+from milk_config import milk_configuration
+from water_config import water_configuration
+
+
+# Arguments of the cached Helmholtz (steam) parameter block
+HELMHOLTZ_CONFIGURATION = {
+    "pure_component": "h2o",
+    "amount_basis": AmountBasis.MOLE,
+    "phase_presentation": PhaseType.LG,
+    "state_vars": StateVars.PH,
+}
+
+# Functions that build each of the parameter blocks that can be cached.
+PARAMETER_BLOCK_BUILDERS = {
+    "milk": lambda: GenericParameterBlock(**milk_configuration),
+    "water": lambda: GenericParameterBlock(**water_configuration),
+    "helmholtz": lambda: HelmholtzParameterBlock(**HELMHOLTZ_CONFIGURATION),
+}
+
+_template = None
+
+
+def template_model():
+    """
+    The model the template parameter blocks are built on. Blocks are only built the
+    first time they are asked for.
+    """
+    global _template
+    if _template is None:
+        _template = pyo.ConcreteModel(name="property_templates")
+    return _template
+
+
+def cached_parameter_block(name):
+    """
+    Return a copy of the named parameter block (see PARAMETER_BLOCK_BUILDERS),
+    ready to be added to a model, e.g m.fs.milk_properties = cached_parameter_block("milk").
+    """
+    m = template_model()
+    if m.find_component(name) is None:
+        m.add_component(name, PARAMETER_BLOCK_BUILDERS[name]())
+    return m.find_component(name).clone()
+
+
+def clear_cache():
+    """
+    Drop the template parameter blocks, e.g after milk_configuration is changed.
+    """
+    global _template
+    _template = None
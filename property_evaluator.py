@@ -0,0 +1,307 @@
+"""
+Vectorised evaluation of the milk_configuration and water_configuration properties with
+NumPy, without building or solving a Pyomo model.
+
+graph_reference_enthalpy.py and graph_reference_entropy.py solve Ipopt once per temperature
+just to evaluate enth_mol and entr_mol. Both configurations are ideal (Ideal EoS, Raoult's law
+equilibrium), so at a given T, P and overall composition the flash can be solved directly
+with the Rachford-Rice equation, and the properties are then sums of the pure component
+correlations (Perrys liquid, NIST/Shomate ideal gas and saturation pressure), evaluated from
+the parameter_data in the configuration dict.
+
+Components without a saturation pressure correlation (e.g milk_solid) are treated as
+non-volatile.
+
+Example:
+
+    evaluator = PropertyEvaluator(milk_configuration)
+    T = np.linspace(280, 430, 150)
+    props = evaluator.evaluate(T, 101325, {"h2o": 0.99999, "milk_solid": 0.00001})
+    props["enth_mol"], props["entr_mol"], props["vapor_frac"]
+
+Use check_against_model to compare with the IDAES property functions.
+"""
+import numpy as np
+from pyomo.environ import value, units as pyunits
+
+from milk_config import milk_configuration
+from water_config import water_configuration
+
+GAS_CONSTANT = 8.314462618  # J/mol/K
+
+
+def _param(data, name, units=None):
+    """
+    Value of a (value, units) parameter from a configuration dict, in the given units.
+    """
+    val, param_units = data[name]
+    if units is None or param_units is None:
+        return val
+    return value(pyunits.convert_value(val, from_units=param_units, to_units=units))
+
+
+def _coeffs(data, name, keys, units):
+    return [_param(data[name], k, u) for k, u in zip(keys, units)]
+
+
+class _Component:
+    """
+    Pure component correlations for one component of a configuration.
+    """
+
+    def __init__(self, name, config, temperature_ref, include_enthalpy_of_formation):
+        data = config["parameter_data"]
+        self.name = name
+        self.temperature_ref = temperature_ref
+
+        J_kmol_K = pyunits.J / pyunits.kmol / pyunits.K
+        self.cp_liq = _coeffs(
+            data,
+            "cp_mol_liq_comp_coeff",
+            ["1", "2", "3", "4", "5"],
+            [J_kmol_K / pyunits.K**i for i in range(5)],
+        )
+        # J/kmol -> J/mol
+        self.cp_liq = [c / 1000 for c in self.cp_liq]
+        self.enth_form_liq = (
+            _param(data, "enth_mol_form_liq_comp_ref", pyunits.J / pyunits.mol)
+            if include_enthalpy_of_formation
+            else 0
+        )
+        self.entr_form_liq = _param(
+            data, "entr_mol_form_liq_comp_ref", pyunits.J / pyunits.mol / pyunits.K
+        )
+
+        self.volatile = "pressure_sat_comp" in config
+        if self.volatile:
+            self.psat = _coeffs(
+                data, "pressure_sat_comp_coeff", ["A", "B", "C"], [None, pyunits.K, pyunits.K]
+            )
+            J_mol_K = pyunits.J / pyunits.mol / pyunits.K
+            kK = pyunits.kiloK
+            self.cp_ig = _coeffs(
+                data,
+                "cp_mol_ig_comp_coeff",
+                ["A", "B", "C", "D", "E", "F", "G", "H"],
+                [
+                    J_mol_K,
+                    J_mol_K / kK,
+                    J_mol_K / kK**2,
+                    J_mol_K / kK**3,
+                    J_mol_K * kK**2,
+                    pyunits.kJ / pyunits.mol,
+                    J_mol_K,
+                    pyunits.kJ / pyunits.mol,
+                ],
+            )
+            self.include_enthalpy_of_formation = include_enthalpy_of_formation
+
+    def pressure_sat(self, T):
+        A, B, C = self.psat
+        return 1e5 * 10 ** (A - B / (T + C))  # NIST Antoine, bar -> Pa
+
+    def enth_mol_liq(self, T):
+        Tr = self.temperature_ref
+        return (
+            sum(c / (i + 1) * (T ** (i + 1) - Tr ** (i + 1)) for i, c in enumerate(self.cp_liq))
+            + self.enth_form_liq
+        )
+
+    def entr_mol_liq(self, T):
+        Tr = self.temperature_ref
+        c1, *rest = self.cp_liq
+        return (
+            c1 * np.log(T / Tr)
+            + sum(c / i * (T**i - Tr**i) for i, c in enumerate(rest, start=1))
+            + self.entr_form_liq
+        )
+
+    def enth_mol_ig(self, T):
+        A, B, C, D, E, F, G, H = self.cp_ig
+        t = T / 1000
+        h = A * t + B * t**2 / 2 + C * t**3 / 3 + D * t**4 / 4 - E / t + F
+        if not self.include_enthalpy_of_formation:
+            h = h - H
+        return h * 1000  # kJ/mol -> J/mol
+
+    def entr_mol_ig(self, T):
+        A, B, C, D, E, F, G, H = self.cp_ig
+        t = T / 1000
+        return A * np.log(t) + B * t + C * t**2 / 2 + D * t**3 / 3 - E / (2 * t**2) + G
+
+
+class PropertyEvaluator:
+    """
+    Evaluates an ideal modular property configuration (e.g milk_configuration) on arrays.
+    """
+
+    def __init__(self, configuration):
+        temperature_ref = _param(configuration, "temperature_ref", pyunits.K)
+        self.pressure_ref = _param(configuration, "pressure_ref", pyunits.Pa)
+        include_formation = configuration.get("include_enthalpy_of_formation", True)
+        self.components = {
+            name: _Component(name, config, temperature_ref, include_formation)
+            for name, config in configuration["components"].items()
+        }
+        self.component_list = list(self.components)
+
+    def _mole_fractions(self, z, shape):
+        if isinstance(z, dict):
+            return np.stack(
+                [np.broadcast_to(np.asarray(z[c], dtype=float), shape) for c in self.component_list],
+                axis=-1,
+            )
+        return np.broadcast_to(np.asarray(z, dtype=float), shape + (len(self.component_list),))
+
+    def flash(self, T, P, z, tol=1e-12, max_iter=100):
+        """
+        Isothermal flash with Raoult's law K values.
+
+        Returns (vapor_frac, x, y, K), where x and y have the component as the last axis.
+        """
+        K = np.stack(
+            [
+                comp.pressure_sat(T) / P if comp.volatile else np.zeros_like(T)
+                for comp in self.components.values()
+            ],
+            axis=-1,
+        )
+
+        def rachford_rice(V):
+            d = 1 + V[..., None] * (K - 1)
+            f = np.sum(z * (K - 1) / d, axis=-1)
+            df = -np.sum(z * (K - 1) ** 2 / d**2, axis=-1)
+            return f, df
+
+        # Single phase if the mixture is below its bubble point or above its dew point
+        f0, _ = rachford_rice(np.zeros_like(T))
+        with np.errstate(divide="ignore"):
+            dew_sum = np.sum(np.where(z > 0, z / K, 0), axis=-1)
+        all_liquid = f0 <= 0
+        all_vapor = dew_sum <= 1
+
+        # Newton's method, kept inside a bracket [lo, hi] with bisection as a fallback.
+        # The root is below the pole of the largest K (and below 1 if any K < 1).
+        lo = np.zeros_like(T)
+        hi = np.ones_like(T)
+        V = np.full_like(T, 0.5)
+        for _ in range(max_iter):
+            f, df = rachford_rice(V)
+            # f is decreasing in V
+            lo = np.where(f > 0, V, lo)
+            hi = np.where(f < 0, V, hi)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                V_new = V - f / df
+            outside = ~np.isfinite(V_new) | (V_new <= lo) | (V_new >= hi)
+            V_new = np.where(outside, (lo + hi) / 2, V_new)
+            if np.all(np.abs(V_new - V) < tol):
+                V = V_new
+                break
+            V = V_new
+
+        V = np.where(all_liquid, 0, np.where(all_vapor, 1, V))
+        x = z / (1 + V[..., None] * (K - 1))
+        x = x / np.sum(x, axis=-1, keepdims=True)
+        y = np.where(all_vapor[..., None], z, K * x)
+        return V, x, y, K
+
+    def evaluate(self, T, P, z):
+        """
+        Evaluate the flash and the mixture properties.
+
+        Args:
+            T: temperature(s) [K]
+            P: pressure(s) [Pa]
+            z: overall mole fractions, either a dict of component: value(s), or an array with
+                the components (in configuration order) on the last axis.
+
+        Returns a dict of arrays: vapor_frac, mole_frac_liq, mole_frac_vap, enth_mol,
+        enth_mol_liq, enth_mol_vap, entr_mol, entr_mol_liq, entr_mol_vap, pressure_bubble.
+        """
+        T, P = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(P, dtype=float))
+        z = self._mole_fractions(z, T.shape)
+
+        V, x, y, K = self.flash(T, P, z)
+
+        comps = list(self.components.values())
+        h_liq = np.stack([c.enth_mol_liq(T) for c in comps], axis=-1)
+        s_liq = np.stack([c.entr_mol_liq(T) for c in comps], axis=-1)
+        # Non-volatile components never appear in the vapour, so their ideal gas
+        # properties aren't needed.
+        h_vap = np.stack(
+            [c.enth_mol_ig(T) if c.volatile else np.zeros_like(T) for c in comps], axis=-1
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s_vap = np.stack(
+                [c.entr_mol_ig(T) if c.volatile else np.zeros_like(T) for c in comps],
+                axis=-1,
+            ) - GAS_CONSTANT * np.log(np.where(y > 0, y, 1) * P[..., None] / self.pressure_ref)
+
+        enth_liq = np.sum(x * h_liq, axis=-1)
+        enth_vap = np.sum(y * h_vap, axis=-1)
+        entr_liq = np.sum(x * s_liq, axis=-1)
+        entr_vap = np.sum(y * s_vap, axis=-1)
+        return {
+            "vapor_frac": V,
+            "mole_frac_liq": x,
+            "mole_frac_vap": y,
+            "enth_mol_liq": enth_liq,
+            "enth_mol_vap": enth_vap,
+            "enth_mol": (1 - V) * enth_liq + V * enth_vap,
+            "entr_mol_liq": entr_liq,
+            "entr_mol_vap": entr_vap,
+            "entr_mol": (1 - V) * entr_liq + V * entr_vap,
+            "pressure_bubble": np.sum(z * K, axis=-1) * P,
+        }
+
+
+def milk_evaluator():
+    return PropertyEvaluator(milk_configuration)
+
+
+def water_evaluator():
+    return PropertyEvaluator(water_configuration)
+
+
+def check_against_model(evaluator, configuration, temperatures):
+    """
+    Compare the pure component correlations of the evaluator with the IDAES property
+    functions (via get_method) at the given temperatures.
+
+    Returns {(component, property): largest absolute difference}.
+    """
+    import pyomo.environ as pyo
+    from idaes.core import FlowsheetBlock
+    from idaes.models.properties.modular_properties import GenericParameterBlock
+    from idaes.models.properties.modular_properties.base.utility import get_method
+
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.properties = GenericParameterBlock(**configuration)
+    # Only used to evaluate the pure component functions, it is never solved.
+    m.fs.sb = m.fs.properties.build_state_block(m.fs.time, defined_state=True)
+    sb = m.fs.sb[m.fs.time.first()]
+
+    temperatures = np.asarray(temperatures, dtype=float)
+    differences = {}
+    for name, comp in evaluator.components.items():
+        cobj = sb.params.get_component(name)
+        checks = {
+            "enth_mol_liq_comp": comp.enth_mol_liq,
+            "entr_mol_liq_comp": comp.entr_mol_liq,
+        }
+        if comp.volatile:
+            checks.update(
+                {
+                    "enth_mol_ig_comp": comp.enth_mol_ig,
+                    "entr_mol_ig_comp": comp.entr_mol_ig,
+                    "pressure_sat_comp": comp.pressure_sat,
+                }
+            )
+        for prop, ours in checks.items():
+            method = get_method(sb, prop, name)
+            theirs = np.array(
+                [value(method(sb, cobj, T * pyunits.K)) for T in temperatures]
+            )
+            differences[name, prop] = float(np.max(np.abs(theirs - ours(temperatures))))
+    return differences
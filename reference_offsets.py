@@ -0,0 +1,205 @@
+"""
+Reference enthalpy/entropy offsets between the milk property package and the Helmholtz
+water package.
+
+The Dsi (and GenericTranslator) assume that the reference enthalpies of the two packages
+line up. find_reference_enthalpy.py and graph_reference_enthalpy.py check this by solving
+Ipopt once per temperature. This calculates the same offset curves (Helmholtz minus milk
+package, for pure water) directly from the pure component property functions, with no
+solver, and stores them as a small NumPy table. A polynomial fit over the liquid region
+is stored as well, which Dsi and GenericTranslator can apply as a correction
+(see their reference_offset_table config options).
+
+Usage:
+
+    python reference_offsets.py                 # calculate, save, and report mismatches
+    python reference_offsets.py --plot
+
+    table = load_offsets()
+    check_offsets(table, tolerance=100)  # points where |dh| > 100 J/mol
+"""
+import argparse
+import os
+
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.environ import value, units as pyunits
+from idaes.core import FlowsheetBlock
+from idaes.core.util.constants import Constants
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    HelmholtzThermoExpressions,
+    AmountBasis,
+    PhaseType,
+)
+from idaes.models.properties.modular_properties import GenericParameterBlock
+from idaes.models.properties.modular_properties.base.utility import get_method
+import idaes.logger as idaeslog
+
+from milk_config import milk_configuration
+
+_log = idaeslog.getLogger(__name__)
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(__file__), "reference_offsets.npz")
+OFFSET_DEGREE = 3
+
+
+def _pure_water_properties(sb, T, P):
+    """
+    Enthalpy and entropy of pure water in the milk package at T and P, from the pure
+    component functions (ideal liquid/ideal gas, as in the package's Ideal EoS).
+    Returns (enth_mol, entr_mol, is_liquid).
+    """
+    cobj = sb.params.get_component("h2o")
+    T = T * pyunits.K
+    p_sat = value(get_method(sb, "pressure_sat_comp", "h2o")(sb, cobj, T))
+    if P >= p_sat:
+        h = get_method(sb, "enth_mol_liq_comp", "h2o")(sb, cobj, T)
+        s = get_method(sb, "entr_mol_liq_comp", "h2o")(sb, cobj, T)
+        return value(h), value(s), True
+    h = get_method(sb, "enth_mol_ig_comp", "h2o")(sb, cobj, T)
+    s = get_method(sb, "entr_mol_ig_comp", "h2o")(sb, cobj, T) - Constants.gas_constant * pyo.log(
+        P * pyunits.Pa / sb.params.pressure_ref
+    )
+    return value(h), value(s), False
+
+
+def compute_offsets(temperatures, pressure=101325):
+    """
+    Calculate the enthalpy and entropy offsets (Helmholtz - milk package) for pure water
+    at each temperature, at the given pressure.
+    """
+    m = pyo.ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+    )
+    m.fs.milk_properties = GenericParameterBlock(**milk_configuration)
+    # Only used to evaluate the pure component functions, it is never solved.
+    m.fs.milk_sb = m.fs.milk_properties.build_state_block(m.fs.time, defined_state=True)
+    sb = m.fs.milk_sb[m.fs.time.first()]
+    te = HelmholtzThermoExpressions(m, m.fs.steam_properties)
+
+    temperatures = np.asarray(temperatures, dtype=float)
+    table = {
+        "temperature": temperatures,
+        "pressure": pressure,
+        "enth_mol_helm": np.empty_like(temperatures),
+        "enth_mol_milk": np.empty_like(temperatures),
+        "entr_mol_helm": np.empty_like(temperatures),
+        "entr_mol_milk": np.empty_like(temperatures),
+        "liquid": np.empty(temperatures.shape, dtype=bool),
+    }
+    for i, T in enumerate(temperatures):
+        h_milk, s_milk, liquid = _pure_water_properties(sb, T, pressure)
+        table["enth_mol_milk"][i] = h_milk
+        table["entr_mol_milk"][i] = s_milk
+        table["liquid"][i] = liquid
+        table["enth_mol_helm"][i] = value(
+            te.h_mol(T=T * pyunits.K, p=pressure * pyunits.Pa)
+        )
+        table["entr_mol_helm"][i] = value(
+            te.s_mol(T=T * pyunits.K, p=pressure * pyunits.Pa)
+        )
+
+    table["enth_mol_offset"] = table["enth_mol_helm"] - table["enth_mol_milk"]
+    table["entr_mol_offset"] = table["entr_mol_helm"] - table["entr_mol_milk"]
+
+    # Fit over the liquid region, which is where the Dsi mixes
+    liquid = table["liquid"]
+    if liquid.sum() < OFFSET_DEGREE + 1:
+        raise ValueError(
+            f"Only {liquid.sum()} of the temperatures are liquid at {pressure} Pa (below the "
+            f"milk package's saturation temperature), a degree {OFFSET_DEGREE} fit needs at "
+            f"least {OFFSET_DEGREE + 1}. Use more temperatures below the boiling point, or a "
+            "higher pressure."
+        )
+    table["enth_mol_offset_coeffs"] = np.polynomial.polynomial.polyfit(
+        temperatures[liquid], table["enth_mol_offset"][liquid], OFFSET_DEGREE
+    )
+    table["entr_mol_offset_coeffs"] = np.polynomial.polynomial.polyfit(
+        temperatures[liquid], table["entr_mol_offset"][liquid], OFFSET_DEGREE
+    )
+    return table
+
+
+def save_offsets(table, fname=DEFAULT_TABLE):
+    np.savez(fname, **table)
+    _log.info(f"Saved reference offsets to {fname}")
+
+
+def load_offsets(fname=DEFAULT_TABLE):
+    with np.load(fname) as data:
+        return {k: data[k] for k in data.files}
+
+
+def optional_path(val):
+    """
+    Config domain for an optional table path.
+    """
+    return None if val is None else str(val)
+
+
+def enth_mol_offset_expr(coeffs, temperature):
+    """
+    Pyomo expression for the liquid enthalpy offset (Helmholtz - milk package) at temperature,
+    from the fitted coefficients.
+    """
+    T = temperature / pyunits.K
+    return sum(float(c) * T**i for i, c in enumerate(coeffs)) * pyunits.J / pyunits.mol
+
+
+def enth_mol_offset_correction(unit, t):
+    """
+    The enthalpy correction of a Dsi or GenericTranslator at time t, or 0 if the unit has
+    no reference_offset_table.
+    """
+    if unit.config.reference_offset_table is None:
+        return 0
+    return unit.reference_offset_correction[t]
+
+
+def check_offsets(table, tolerance=100, entropy_tolerance=1):
+    """
+    Return the temperatures where the offsets are larger than the tolerances
+    (J/mol and J/mol/K), i.e where the reference states don't line up.
+    """
+    bad = (np.abs(table["enth_mol_offset"]) > tolerance) | (
+        np.abs(table["entr_mol_offset"]) > entropy_tolerance
+    )
+    return table["temperature"][bad]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calculate reference offsets")
+    parser.add_argument("--pressure", type=float, default=101325)
+    parser.add_argument("--fname", default=DEFAULT_TABLE)
+    parser.add_argument("--tolerance", type=float, default=100)
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args()
+
+    table = compute_offsets([280 + i for i in range(150)], pressure=args.pressure)
+    save_offsets(table, args.fname)
+
+    mismatched = check_offsets(table, tolerance=args.tolerance)
+    if len(mismatched):
+        print(
+            f"Enthalpy/entropy offsets above tolerance at {len(mismatched)} temperatures "
+            f"({mismatched.min()} - {mismatched.max()} K)"
+        )
+    else:
+        print("Reference states line up within tolerance.")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        fig, (ax_h, ax_s) = plt.subplots(2, sharex=True)
+        ax_h.plot(table["temperature"], table["enth_mol_offset"])
+        ax_h.set_ylabel("Enthalpy offset (J/mol)")
+        ax_s.plot(table["temperature"], table["entr_mol_offset"])
+        ax_s.set_ylabel("Entropy offset (J/mol/K)")
+        ax_s.set_xlabel("Temperature (K)")
+        ax_h.set_title("Helmholtz - milk pp, pure water")
+        plt.show()
@@ -0,0 +1,221 @@
+"""
+Solve driver for Dsi flowsheets that retries a failed solve with other strategies, instead
+of leaving it infeasible (as all the "temperature ... with initialisation" cases in
+initialisation_experiment_evaporator.py end up, after 40-140 iterations).
+
+An attempt fails when Ipopt doesn't end at an optimal solution (e.g it stops at a locally
+infeasible point, which the temperature cases do by themselves after 40-60 iterations) or
+hits the iteration limit. To find out early, each solve first gets probe_iter iterations,
+and only carries on past that (up to max_iter) if it is making progress: its primal
+infeasibility has at least halved and it isn't stuck in the restoration phase (see
+continuation.probe_solve). If it fails, the model is put back to the state it was in
+before the attempt (see state_snapshot.py) and the next strategy is tried:
+
+ - direct: solve as is
+ - decomposition: solve the strongly connected components in order (see
+   decomposition_solve.py), for square models. Not in the default strategies, put it
+   first for simulation runs.
+ - continuation: step the fixed inputs from the last converged solution to their new
+   values with continuation.py (needs a previous converged solve by this driver)
+ - spec_swap: for each (spec, alternative) pair where the spec is fixed, solve with the
+   alternative fixed instead (e.g heat duty rather than outlet temperature), then switch
+   back to the spec, starting from that solution
+ - relaxed_vle: solve with the smooth VLE smoothing parameters (eps_*) relaxed, then
+   again with the original values from that solution
+
+Example:
+
+    driver = SolveDriver(
+        m,
+        spec_swaps=[(m.fs.effect_1.outlet.temperature[0], m.fs.effect_1.heat_duty[0])],
+    )
+    m.fs.effect_1.outlet.temperature.fix(365.15)
+    result = driver.solve()
+    result["converged"], result["strategy"], result["attempts"]
+"""
+import time
+
+import pyomo.environ as pyo
+from pyomo.contrib.solver.ipopt import Ipopt
+import idaes.logger as idaeslog
+
+from state_snapshot import SnapshotIndex
+from continuation import continuation, probe_solve
+from decomposition_solve import solve_decomposed
+
+_log = idaeslog.getLogger(__name__)
+
+DEFAULT_STRATEGIES = ("direct", "continuation", "spec_swap", "relaxed_vle")
+
+
+class SolveDriver:
+    """
+    Solves m, falling back through strategies when a solve fails.
+
+    Args:
+        m: the model. Strategies only change the values and fixed flags of variables
+            (and the smoothing Params), so it must not be rebuilt between solves.
+        spec_swaps: list of (spec var, alternative var) pairs for the spec_swap strategy.
+        strategies: the strategy names to try, in order.
+        max_iter: Ipopt iteration limit for each solve. This is only a cap for runaway
+            solves (e.g the 140 iteration one in initialisation_experiment_evaporator.py),
+            as converged solves from initialisation take up to 54 iterations there.
+        probe_iter: iterations a solve gets before it is checked for progress. Solves
+            that aren't converging stop here rather than running to max_iter.
+        continuation_steps: number of steps the continuation strategy starts with.
+        vle_relaxation: factor to multiply the smooth VLE eps parameters by.
+        options: other Ipopt options.
+    """
+
+    def __init__(
+        self,
+        m,
+        spec_swaps=(),
+        strategies=DEFAULT_STRATEGIES,
+        max_iter=100,
+        probe_iter=20,
+        continuation_steps=4,
+        vle_relaxation=10,
+        options=None,
+    ):
+        self.model = m
+        self.spec_swaps = list(spec_swaps)
+        self.strategies = list(strategies)
+        self.max_iter = max_iter
+        self.probe_iter = probe_iter
+        self.continuation_steps = continuation_steps
+        self.vle_relaxation = vle_relaxation
+        self.options = dict(options or {})
+        self.index = SnapshotIndex(m)
+        self.last_converged = None
+        self.opt = Ipopt()
+        self.opt.config.raise_exception_on_nonoptimal_result = False
+        self.opt.config.load_solutions = False
+
+    def _solve_once(self, attempt):
+        converged, iterations, results = probe_solve(
+            self.opt, self.model, self.max_iter, self.probe_iter, self.options
+        )
+        attempt["iterations"] += iterations
+        attempt["status"] = str(results.solution_status)
+        return converged
+
+    def _direct(self, attempt):
+        return self._solve_once(attempt)
+
+    def _decomposition(self, attempt):
+        result = solve_decomposed(self.model, fallback=False, index=self.index)
+        attempt["status"] = "converged" if result["converged"] else "failed"
+        return result["converged"]
+
+    def _continuation(self, attempt):
+        if self.last_converged is None:
+            return None
+        target = self.index.take()
+        start = self.last_converged
+        # Everything fixed now is stepped from its value in the last solution (which is
+        # also where a spec that used to be calculated, e.g outlet temperature, ended up)
+        stepped = [
+            (v, start.values[i], target.values[i])
+            for i, v in enumerate(self.index.vars)
+            if target.fixed[i] and start.values[i] != target.values[i]
+        ]
+        if not stepped:
+            return None
+        self.index.restore(start, fixed=False)
+        result = continuation(
+            self.model,
+            {v: b for v, a, b in stepped},
+            initial_step=1 / self.continuation_steps,
+            max_iter=self.max_iter,
+            probe_iter=self.probe_iter,
+            options=self.options,
+            index=self.index,
+        )
+        attempt["iterations"] += result["iterations"]
+        attempt["status"] = f"continuation reached {result['progress']:.3f}"
+        return result["converged"]
+
+    def _spec_swap(self, attempt):
+        swaps = [(s, a) for s, a in self.spec_swaps if s.fixed and not a.fixed]
+        if not swaps:
+            return None
+        for spec, alternative in swaps:
+            spec.unfix()
+            alternative.fix()
+        try:
+            if not self._solve_once(attempt):
+                return False
+        finally:
+            for spec, alternative in swaps:
+                alternative.unfix()
+                spec.fix()
+        return self._solve_once(attempt)
+
+    def _relaxed_vle(self, attempt):
+        eps = [
+            p
+            for p in self.model.component_data_objects(pyo.Param, descend_into=True)
+            if p.parent_component().local_name.startswith("eps_")
+            and p.parent_component().mutable
+        ]
+        if not eps:
+            return None
+        original = [pyo.value(p) for p in eps]
+        for p, val in zip(eps, original):
+            p.set_value(val * self.vle_relaxation)
+        try:
+            if not self._solve_once(attempt):
+                return False
+        finally:
+            for p, val in zip(eps, original):
+                p.set_value(val)
+        return self._solve_once(attempt)
+
+    def solve(self):
+        """
+        Solve the model as it is currently specified.
+
+        Returns a dict with converged, strategy (the one that worked, or None), iterations,
+        time, status, and attempts (a dict for each strategy that was tried). Time spent
+        on failed attempts is reported separately as wasted_time.
+        """
+        before = self.index.take()
+        attempts = []
+        start = time.perf_counter()
+        converged = False
+        strategy = None
+        for name in self.strategies:
+            attempt = {"strategy": name, "iterations": 0, "status": None}
+            attempt_start = time.perf_counter()
+            ok = getattr(self, "_" + name)(attempt)
+            attempt["time"] = time.perf_counter() - attempt_start
+            if ok is None:
+                # Not applicable to this model/state
+                continue
+            attempts.append(attempt)
+            if ok:
+                converged = True
+                strategy = name
+                break
+            _log.info(
+                f"{name} failed after {attempt['iterations']} iterations "
+                f"({attempt['time']:.2f} s), trying the next strategy"
+            )
+            self.index.restore(before)
+
+        if converged:
+            self.last_converged = self.index.take()
+        else:
+            self.index.restore(before)
+            _log.warning("All solve strategies failed")
+
+        return {
+            "converged": converged,
+            "strategy": strategy,
+            "iterations": sum(a["iterations"] for a in attempts),
+            "time": time.perf_counter() - start,
+            "wasted_time": sum(a["time"] for a in attempts if a["strategy"] != strategy),
+            "status": attempts[-1]["status"] if attempts else None,
+            "attempts": attempts,
+        }
@@ -0,0 +1,219 @@
+"""
+Persistent solver session for repeated re-solves of a Dsi flowsheet.
+
+initialisation_experiment_evaporator.solve() creates a new Ipopt() and writes the whole
+NL file for every solve, even when only the heat duty or an outlet temperature changed,
+and that fixed overhead is most of the ~0.07 s "from previous solve" time.
+
+This writes the NL file once, keeps the compiled AMPL (ASL) interface loaded through
+PyNumero's PyomoNLP, and runs Ipopt in-process through cyipopt. The inputs that will
+change between solves are declared up front: they are kept in the NLP as variables with
+equal lower and upper bounds (which Ipopt treats as fixed), so changing them only changes
+two numbers in the bound vectors. Each solve is warm started from the previous primal and
+dual solution.
+
+Needs cyipopt and the PyNumero ASL library (`idaes get-extensions` installs it). cyipopt
+isn't in requirements.txt, as it has to be built against an Ipopt library: install it
+with conda (conda install -c conda-forge cyipopt) or pip once Ipopt is installed.
+SolverSession raises an ImportError saying which one is missing.
+
+Example:
+
+    session = SolverSession(
+        m, inputs=[m.fs.effect_1.heat_duty[0], m.fs.effect_1.outlet.temperature[0]]
+    )
+    session.release(m.fs.effect_1.outlet.temperature[0])  # heat duty spec
+    for heat_duty in HEAT_DUTY_VALUES:
+        session.solve({m.fs.effect_1.heat_duty[0]: heat_duty})
+    # Switch to an outlet temperature spec, without rewriting the NL file
+    session.release(m.fs.effect_1.heat_duty[0])
+    session.solve({m.fs.effect_1.outlet.temperature[0]: 365.15})
+    session.close()
+
+Dsi.input_vars and GenericTranslator.input_vars give the variables to declare, and their
+update_inputs methods change the operating point in place:
+
+    session = SolverSession(m, inputs=m.fs.dsi.input_vars(0).values())
+    session.solve({var: var.value for var in m.fs.dsi.update_inputs(steam_pressure=8e5)})
+"""
+import time
+
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.contrib.pynumero.interfaces.pyomo_nlp import PyomoNLP
+from pyomo.contrib.pynumero.asl import AmplInterface
+# pyomo defers the cyipopt import, so this module can be imported without it
+from pyomo.contrib.pynumero.interfaces.cyipopt_interface import (
+    CyIpoptNLP,
+    cyipopt_available,
+)
+import idaes.logger as idaeslog
+
+_log = idaeslog.getLogger(__name__)
+
+# cyipopt status codes that mean a usable solution
+_SOLVED = (0, 1)  # Solve_Succeeded, Solved_To_Acceptable_Level
+
+
+class _SessionProblem(CyIpoptNLP):
+    """
+    CyIpoptNLP that takes its variable bounds and starting point from the session
+    rather than from the NLP, and counts iterations.
+    """
+
+    def __init__(self, nlp, x_lb, x_ub, x_init):
+        self._x_lb = x_lb
+        self._x_ub = x_ub
+        self._x_init = x_init
+        self.iteration_count = 0
+        super().__init__(nlp)
+
+    def x_init(self):
+        return self._x_init
+
+    def x_lb(self):
+        return self._x_lb
+
+    def x_ub(self):
+        return self._x_ub
+
+    def intermediate(self, alg_mod, iter_count, *args):
+        self.iteration_count = iter_count
+        return True
+
+
+class SolverSession:
+    """
+    Keeps the NLP for the model m loaded between solves.
+
+    Args:
+        m: the model to solve. It should be square once the inputs are fixed.
+        inputs: the variables whose fixed values will change between solves.
+        options: Ipopt options.
+    """
+
+    def __init__(self, m, inputs, options=None):
+        if not cyipopt_available:
+            raise ImportError(
+                "SolverSession needs cyipopt, install it with "
+                "`conda install -c conda-forge cyipopt` (or pip, with Ipopt installed)"
+            )
+        if not AmplInterface.available():
+            raise ImportError(
+                "SolverSession needs the PyNumero ASL library, install it with "
+                "`idaes get-extensions`"
+            )
+        self.model = m
+        self.inputs = list(inputs)
+        self.options = dict(options or {})
+        self._original = {
+            id(v): (v.fixed, v.lb, v.ub) for v in self.inputs
+        }
+
+        # PyomoNLP needs an objective
+        if not any(m.component_data_objects(pyo.Objective, active=True)):
+            m._session_objective = pyo.Objective(expr=0)
+
+        # Keep the inputs in the NLP as variables, pinned by their bounds
+        for v in self.inputs:
+            was_fixed = v.fixed
+            v.unfix()
+            if was_fixed:
+                v.setlb(v.value)
+                v.setub(v.value)
+
+        start = time.perf_counter()
+        self.nlp = PyomoNLP(m)
+        self.build_time = time.perf_counter() - start
+
+        self._input_index = dict(
+            zip((id(v) for v in self.inputs), self.nlp.get_primal_indices(self.inputs))
+        )
+        self.x_lb = self.nlp.primals_lb().copy()
+        self.x_ub = self.nlp.primals_ub().copy()
+        self.x = self.nlp.init_primals().copy()
+        self.duals = None
+        self.n_solves = 0
+        self.solve_times = []
+
+    def set(self, var, val):
+        """
+        Fix an input to a new value.
+        """
+        i = self._input_index[id(var)]
+        self.x_lb[i] = val
+        self.x_ub[i] = val
+        self.x[i] = val
+        var.set_value(val)
+
+    def release(self, var):
+        """
+        Free an input, so it is calculated by the solve (e.g to switch specification).
+        """
+        i = self._input_index[id(var)]
+        _, lb, ub = self._original[id(var)]
+        self.x_lb[i] = -np.inf if lb is None else lb
+        self.x_ub[i] = np.inf if ub is None else ub
+
+    def solve(self, changes=None, tee=False):
+        """
+        Apply changes ({input var: value}) and re-solve, warm started from the previous
+        solution. The solution is loaded into the model if it converged.
+
+        Returns a dict with the status, message, iteration count and time.
+        """
+        for var, val in (changes or {}).items():
+            self.set(var, val)
+
+        start = time.perf_counter()
+        problem = _SessionProblem(self.nlp, self.x_lb, self.x_ub, self.x)
+        problem.add_option("print_level", 5 if tee else 0)
+        for k, v in self.options.items():
+            problem.add_option(k, v)
+
+        if self.duals is None:
+            x, info = problem.solve(self.x)
+        else:
+            problem.add_option("warm_start_init_point", "yes")
+            x, info = problem.solve(
+                self.x,
+                lagrange=self.duals["mult_g"],
+                zl=self.duals["mult_x_L"],
+                zu=self.duals["mult_x_U"],
+            )
+        elapsed = time.perf_counter() - start
+        self.solve_times.append(elapsed)
+        self.n_solves += 1
+
+        converged = info["status"] in _SOLVED
+        if converged:
+            self.x = x
+            self.duals = {k: info[k] for k in ("mult_g", "mult_x_L", "mult_x_U")}
+            self.nlp.set_primals(x)
+            self.nlp.set_duals(info["mult_g"])
+            self.nlp.load_state_into_pyomo()
+        else:
+            _log.warning(f"Solve {self.n_solves} failed: {info['status_msg']}")
+
+        return {
+            "converged": converged,
+            "status": info["status"],
+            "message": info["status_msg"],
+            "iterations": problem.iteration_count,
+            "time": elapsed,
+        }
+
+    def close(self):
+        """
+        Put the original bounds back on the inputs, and fix the inputs that are currently
+        set (rather than released), keeping their current values.
+        """
+        for v in self.inputs:
+            i = self._input_index[id(v)]
+            _, lb, ub = self._original[id(v)]
+            v.setlb(lb)
+            v.setub(ub)
+            if self.x_lb[i] == self.x_ub[i]:
+                v.fix()
+        if hasattr(self.model, "_session_objective"):
+            self.model.del_component(self.model._session_objective)
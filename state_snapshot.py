@@ -0,0 +1,132 @@
+"""
+Flat NumPy snapshots of a model's variable values, as a faster replacement for
+to_json(m, return_dict=True) / from_json(m, sd=...) when restoring a flowsheet between cases.
+
+to_json walks the whole block tree and builds a nested dict of every component (values,
+bounds, fixed flags, active flags, suffixes), which is slow and memory heavy for large
+flowsheets with many Dsi and translator units. Most of the time only the variable values
+and fixed flags need to be put back, so this keeps those in two flat arrays, in the order
+of a SnapshotIndex (the variables of the model in a stable, sorted order). A snapshot
+is then one array copy to take, a single pass over the variables to restore, and two
+snapshots can be compared with NumPy.
+
+Snapshots can be saved to .npy files and opened memory-mapped, so large snapshots
+aren't read into memory until they are used, and several processes can share them.
+
+Only variable values and fixed flags are captured: bounds, active flags and suffixes
+(e.g scaling factors) aren't, so use to_json for those.
+
+Example:
+
+    index = SnapshotIndex(m)
+    default_values = index.take()
+    ...
+    index.restore(default_values)
+
+    index.save("defaults", default_values)
+    snapshot = index.load("defaults")     # memory-mapped
+    index.diff(snapshot, index.take())    # what changed
+"""
+import hashlib
+import json
+
+import numpy as np
+import pyomo.environ as pyo
+
+
+class Snapshot:
+    """
+    Variable values (NaN for None) and fixed flags, in SnapshotIndex order.
+    """
+
+    def __init__(self, values, fixed):
+        self.values = values
+        self.fixed = fixed
+
+    def copy(self):
+        return Snapshot(np.array(self.values), np.array(self.fixed))
+
+
+class SnapshotIndex:
+    """
+    The variables of m (or a block of it) in a stable order, used to take and restore
+    flat snapshots.
+
+    The order only depends on the component names, so an index built on another copy of
+    the same flowsheet (e.g in a sweep worker) is compatible; signature is a hash of
+    the names, stored with saved snapshots to check this.
+    """
+
+    def __init__(self, m):
+        self.vars = list(
+            m.component_data_objects(pyo.Var, descend_into=True, sort=True)
+        )
+        self.names = [v.name for v in self.vars]
+        self.signature = hashlib.sha1("\n".join(self.names).encode()).hexdigest()
+
+    def __len__(self):
+        return len(self.vars)
+
+    def take(self):
+        """
+        Snapshot of the current values and fixed flags.
+        """
+        n = len(self.vars)
+        values = np.fromiter(
+            (np.nan if v.value is None else v.value for v in self.vars), dtype=float, count=n
+        )
+        fixed = np.fromiter((v.fixed for v in self.vars), dtype=bool, count=n)
+        return Snapshot(values, fixed)
+
+    def restore(self, snapshot, fixed=True):
+        """
+        Put the values (and, if fixed is True, the fixed flags) of snapshot back on the
+        variables.
+        """
+        # tolist() converts the whole array to Python floats at once, which is much quicker
+        # than indexing a (possibly memory-mapped) array element by element.
+        values = snapshot.values.tolist()
+        for v, val in zip(self.vars, values):
+            v.set_value(None if val != val else val, skip_validation=True)
+        if fixed:
+            for v, is_fixed in zip(self.vars, snapshot.fixed.tolist()):
+                v.fixed = is_fixed
+
+    def diff(self, a, b, rtol=1e-8, atol=0):
+        """
+        The variables that differ between snapshots a and b, as a list of
+        (name, value in a, value in b). Changes in fixed flags are included.
+        """
+        changed = ~np.isclose(a.values, b.values, rtol=rtol, atol=atol, equal_nan=True)
+        changed |= a.fixed != b.fixed
+        return [
+            (self.names[i], float(a.values[i]), float(b.values[i]))
+            for i in np.flatnonzero(changed)
+        ]
+
+    def save(self, fname, snapshot):
+        """
+        Save snapshot as fname.values.npy, fname.fixed.npy and fname.json (the signature
+        and variable names).
+        """
+        np.save(f"{fname}.values.npy", snapshot.values)
+        np.save(f"{fname}.fixed.npy", snapshot.fixed)
+        with open(f"{fname}.json", "w") as f:
+            json.dump({"signature": self.signature, "names": self.names}, f)
+
+    def load(self, fname, mmap_mode="r"):
+        """
+        Open a snapshot saved with save, memory-mapped by default. Raises ValueError if it
+        was saved from a model with different variables.
+        """
+        with open(f"{fname}.json") as f:
+            signature = json.load(f)["signature"]
+        if signature != self.signature:
+            raise ValueError(
+                f"Snapshot {fname} was saved from a different model (signature {signature}, "
+                f"expected {self.signature})"
+            )
+        return Snapshot(
+            np.load(f"{fname}.values.npy", mmap_mode=mmap_mode),
+            np.load(f"{fname}.fixed.npy", mmap_mode=mmap_mode),
+        )
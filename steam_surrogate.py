@@ -0,0 +1,505 @@
+"""
+Tabulated surrogate for the Helmholtz water property package.
+
+The HelmholtzParameterBlock calls compiled external functions for every residual and
+derivative evaluation. For the steam inlets of a Dsi we only need h(P, T), T(P, h) and
+the vapour fraction over a limited range (10 kPa - 10 bar, 273 - 500 K), so this package
+answers those from smooth polynomial fits of a table generated once from the Helmholtz
+package and stored on disk. Everything in the state block is then plain Pyomo algebra,
+and the derivatives come from Pyomo's automatic differentiation.
+
+A bicubic spline over the table isn't used in the model itself, as picking the spline cell
+isn't smooth (or algebraic). Instead, each phase region is fitted separately, and the regions
+are joined at saturation with smooth max/min functions. Each fit is only evaluated over the
+enthalpies it was fitted to: the enthalpy is clipped (smoothly) to the liquid or vapour side
+of saturation before it goes into that region's fit, as a polynomial extrapolated into the
+other region is meaningless.
+
+generate_table checks the fits against the Helmholtz package at points between the table
+points, and raises an error (without saving) if they are off by more than
+max_temperature_error or max_enthalpy_error. Close to saturation the smoothing dominates
+the error, so points within SATURATION_BAND of it aren't checked.
+
+Generate the table (requires the Helmholtz external functions):
+
+    python steam_surrogate.py
+
+Then use it in place of HelmholtzParameterBlock (with StateVars.PH):
+
+    m.fs.steam_properties = SteamSurrogateParameterBlock()
+    m.fs.dsi = Dsi(property_package=m.fs.milk_properties,
+                   steam_property_package=m.fs.steam_properties)
+    m.fs.dsi.properties_steam_in[0].enth_mol.fix(
+        m.fs.steam_properties.htpx(T=458.15, p=1e6)
+    )
+"""
+import os
+
+import numpy as np
+from pyomo.environ import (
+    Var,
+    Param,
+    Expression,
+    log,
+    value,
+    units as pyunits,
+)
+from pyomo.common.config import ConfigValue
+from idaes.core import (
+    declare_process_block_class,
+    PhysicalParameterBlock,
+    StateBlockData,
+    StateBlock,
+    MaterialBalanceType,
+    EnergyBalanceType,
+    MaterialFlowBasis,
+    LiquidPhase,
+    VaporPhase,
+    Component,
+)
+from idaes.core.util.exceptions import ConfigurationError
+from idaes.core.util.math import smooth_max, smooth_min
+import idaes.logger as idaeslog
+
+# Set up logger
+_log = idaeslog.getLogger(__name__)
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(__file__), "steam_surrogate_table.npz")
+
+PRESSURE_RANGE = (1e4, 1e6)  # Pa
+TEMPERATURE_RANGE = (273.16, 500)  # K
+
+# Features are scaled so the polynomial coefficients are all of similar magnitude.
+H_SCALE = 1e4  # J/mol
+P_REF = 1e5  # Pa
+
+SAT_DEGREE = 6
+REGION_DEGREE = 4
+
+# Default smoothing parameter for the phase region transitions, in H_SCALE units
+SMOOTHING_EPS = 1e-2
+# The accuracy check skips points this close to saturation [K], where the error is mostly
+# the smoothing (up to eps / 2 in enthalpy right at saturation)
+SATURATION_BAND = 5
+
+
+def _sat_features(lnp):
+    return np.polynomial.polynomial.polyvander(lnp, SAT_DEGREE)
+
+
+def _region_features(x, lnp):
+    return np.polynomial.polynomial.polyvander2d(x, lnp, [REGION_DEGREE, REGION_DEGREE])
+
+
+def _fit(features, target):
+    coeffs, *_ = np.linalg.lstsq(features, target, rcond=None)
+    return coeffs
+
+
+def _np_smooth_max(a, b, eps):
+    return 0.5 * (a + b + np.sqrt((a - b) ** 2 + eps**2))
+
+
+def _np_smooth_min(a, b, eps):
+    return 0.5 * (a + b - np.sqrt((a - b) ** 2 + eps**2))
+
+
+def _scaled_temperature(coeffs, h, lnp, eps, smooth_max, smooth_min):
+    """
+    Temperature / 100 K from the scaled enthalpy h and ln(p / P_REF), as used by the state
+    block. Works on Pyomo expressions (with the idaes smooth functions) or NumPy arrays.
+
+    The liquid fit only sees enthalpies up to saturated liquid and the vapour fit only
+    enthalpies from saturated vapour up, and each contributes its change from its
+    saturation value, so in the two phase region the temperature is the saturation
+    temperature.
+    """
+    h_liq_sat = _poly1(coeffs["enth_mol_liq_sat"], lnp)
+    h_vap_sat = _poly1(coeffs["enth_mol_vap_sat"], lnp)
+    t_sat = _poly1(coeffs["temperature_sat"], lnp) / 100
+    h_liq = smooth_min(h, h_liq_sat, eps)
+    h_vap = smooth_max(h, h_vap_sat, eps)
+    return (
+        t_sat
+        + _poly2(coeffs["temperature_liq"], h_liq, lnp)
+        - _poly2(coeffs["temperature_liq"], h_liq_sat, lnp)
+        + _poly2(coeffs["temperature_vap"], h_vap, lnp)
+        - _poly2(coeffs["temperature_vap"], h_vap_sat, lnp)
+    )
+
+
+def _check_accuracy(
+    coeffs, te, steam_properties, pressure, temperature, max_temperature_error,
+    max_enthalpy_error
+):
+    """
+    Compare the fits with the Helmholtz package at the midpoints of the table grid, and
+    raise a ValueError if the temperature or enthalpy errors are too large.
+    """
+    p_mid = np.sqrt(pressure[1:] * pressure[:-1])
+    t_mid = (temperature[1:] + temperature[:-1]) / 2
+    P, T = np.meshgrid(p_mid, t_mid, indexing="ij")
+    t_sat = np.array([value(te.T_sat(p=p * pyunits.Pa)) for p in p_mid])[:, None]
+    check = np.abs(T - t_sat) > SATURATION_BAND
+    P, T = P[check], T[check]
+
+    enth_mol = np.array(
+        [
+            value(steam_properties.htpx(T=t * pyunits.K, p=p * pyunits.Pa))
+            for p, t in zip(P, T)
+        ]
+    )
+    lnp = np.log(P / P_REF)
+    temperature_fit = 100 * _scaled_temperature(
+        coeffs, enth_mol / H_SCALE, lnp, SMOOTHING_EPS, _np_smooth_max, _np_smooth_min
+    )
+    vapour = T > _poly1(coeffs["temperature_sat"], lnp)
+    enth_mol_fit = H_SCALE * np.where(
+        vapour,
+        _poly2(coeffs["enth_mol_vap"], T / 100, lnp),
+        _poly2(coeffs["enth_mol_liq"], T / 100, lnp),
+    )
+
+    temperature_error = np.max(np.abs(temperature_fit - T))
+    enth_mol_error = np.max(np.abs(enth_mol_fit - enth_mol))
+    _log.info(
+        f"Steam surrogate max errors: temperature {temperature_error:.3f} K, "
+        f"enthalpy {enth_mol_error:.1f} J/mol ({check.sum()} points)"
+    )
+    if temperature_error > max_temperature_error or enth_mol_error > max_enthalpy_error:
+        raise ValueError(
+            f"Steam surrogate fits are too far from the Helmholtz package: max temperature "
+            f"error {temperature_error:.3f} K (allowed {max_temperature_error} K), max "
+            f"enthalpy error {enth_mol_error:.1f} J/mol (allowed {max_enthalpy_error} J/mol)"
+        )
+    return temperature_error, enth_mol_error
+
+
+def generate_table(
+    fname=DEFAULT_TABLE,
+    n_pressure=60,
+    n_temperature=120,
+    max_temperature_error=0.5,
+    max_enthalpy_error=100,
+):
+    """
+    Evaluate the Helmholtz package over a pressure/temperature grid, fit the surrogate
+    polynomials, check them against the Helmholtz package between the grid points, and
+    save both the table and the coefficients to fname.
+
+    Raises a ValueError if the fits are off by more than max_temperature_error [K] or
+    max_enthalpy_error [J/mol] anywhere outside SATURATION_BAND of saturation.
+    """
+    import pyomo.environ as pyo
+    from idaes.models.properties.general_helmholtz import (
+        HelmholtzParameterBlock,
+        HelmholtzThermoExpressions,
+        AmountBasis,
+        PhaseType,
+    )
+
+    m = pyo.ConcreteModel()
+    m.steam_properties = HelmholtzParameterBlock(
+        pure_component="h2o",
+        amount_basis=AmountBasis.MOLE,
+        phase_presentation=PhaseType.LG,
+    )
+    te = HelmholtzThermoExpressions(m, m.steam_properties)
+
+    pressure = np.geomspace(*PRESSURE_RANGE, n_pressure)
+    temperature = np.linspace(*TEMPERATURE_RANGE, n_temperature)
+
+    t_sat = np.array([value(te.T_sat(p=p * pyunits.Pa)) for p in pressure])
+    h_liq_sat = np.array([value(te.h_mol(p=p * pyunits.Pa, x=0)) for p in pressure])
+    h_vap_sat = np.array([value(te.h_mol(p=p * pyunits.Pa, x=1)) for p in pressure])
+    enth_mol = np.array(
+        [
+            [
+                value(m.steam_properties.htpx(T=t * pyunits.K, p=p * pyunits.Pa))
+                for t in temperature
+            ]
+            for p in pressure
+        ]
+    )
+
+    lnp_sat = np.log(pressure / P_REF)
+    coeffs = {
+        "temperature_sat": _fit(_sat_features(lnp_sat), t_sat),
+        "enth_mol_liq_sat": _fit(_sat_features(lnp_sat), h_liq_sat / H_SCALE),
+        "enth_mol_vap_sat": _fit(_sat_features(lnp_sat), h_vap_sat / H_SCALE),
+    }
+
+    P, T = np.meshgrid(pressure, temperature, indexing="ij")
+    lnp = np.log(P / P_REF)
+    for phase, mask in (("liq", T < t_sat[:, None]), ("vap", T > t_sat[:, None])):
+        h = enth_mol[mask] / H_SCALE
+        coeffs[f"temperature_{phase}"] = _fit(
+            _region_features(h, lnp[mask]), T[mask] / 100
+        ).reshape(REGION_DEGREE + 1, REGION_DEGREE + 1)
+        coeffs[f"enth_mol_{phase}"] = _fit(
+            _region_features(T[mask] / 100, lnp[mask]), h
+        ).reshape(REGION_DEGREE + 1, REGION_DEGREE + 1)
+
+    _check_accuracy(
+        coeffs,
+        te,
+        m.steam_properties,
+        pressure,
+        temperature,
+        max_temperature_error,
+        max_enthalpy_error,
+    )
+
+    np.savez(
+        fname,
+        pressure=pressure,
+        temperature=temperature,
+        enth_mol=enth_mol,
+        temperature_sat=t_sat,
+        enth_mol_liq_sat=h_liq_sat,
+        enth_mol_vap_sat=h_vap_sat,
+        **{f"coeff_{k}": v for k, v in coeffs.items()},
+    )
+    _log.info(f"Saved steam surrogate table to {fname}")
+    return fname
+
+
+# Coefficients are converted to floats so numpy scalars don't end up inside Pyomo expressions.
+def _poly1(c, x):
+    return sum(float(c[i]) * x**i for i in range(len(c)))
+
+
+def _poly2(c, x, y):
+    n, k = c.shape
+    return sum(float(c[i, j]) * x**i * y**j for i in range(n) for j in range(k))
+
+
+@declare_process_block_class("SteamSurrogateParameterBlock")
+class SteamSurrogateParameterData(PhysicalParameterBlock):
+    """
+    Property parameter block for the tabulated water/steam surrogate.
+
+    The state variables are flow_mol, enth_mol and pressure (like the Helmholtz package
+    with StateVars.PH), and the table is loaded from the table_file config option.
+    """
+
+    CONFIG = PhysicalParameterBlock.CONFIG()
+    CONFIG.declare(
+        "table_file",
+        ConfigValue(
+            default=DEFAULT_TABLE,
+            domain=str,
+            description="Path to the table generated by steam_surrogate.generate_table",
+        ),
+    )
+
+    def build(self):
+        super().build()
+        self._state_block_class = SteamSurrogateStateBlock
+
+        self.h2o = Component()
+        self.Liq = LiquidPhase()
+        self.Vap = VaporPhase()
+
+        if not os.path.exists(self.config.table_file):
+            raise ConfigurationError(
+                f"{self.name} could not find the steam surrogate table "
+                f"{self.config.table_file}. Run `python steam_surrogate.py` to generate it."
+            )
+        table = np.load(self.config.table_file)
+        self.table_pressure_range = (
+            float(table["pressure"][0]),
+            float(table["pressure"][-1]),
+        )
+        self.table_temperature_range = (
+            float(table["temperature"][0]),
+            float(table["temperature"][-1]),
+        )
+        self.coeffs = {
+            k[len("coeff_"):]: table[k] for k in table.files if k.startswith("coeff_")
+        }
+
+        self.smoothing_eps = Param(
+            initialize=SMOOTHING_EPS,
+            mutable=True,
+            doc="Smoothing parameter for the phase region transitions (scaled units)",
+        )
+
+    def htpx(self, T, p):
+        """
+        Molar enthalpy [J/mol] of water at temperature T [K] and pressure p [Pa],
+        evaluated numerically from the surrogate. Use this to fix inlet enthalpies.
+        """
+        T = value(T)
+        lnp = np.log(value(p) / P_REF)
+        phase = "liq" if T < _poly1(self.coeffs["temperature_sat"], lnp) else "vap"
+        return float(_poly2(self.coeffs[f"enth_mol_{phase}"], T / 100, lnp)) * H_SCALE
+
+    @classmethod
+    def define_metadata(cls, obj):
+        obj.add_properties(
+            {
+                "flow_mol": {"method": None},
+                "enth_mol": {"method": None},
+                "pressure": {"method": None},
+                "temperature": {"method": None},
+                "vapor_frac": {"method": None},
+                "phase_frac": {"method": None},
+                "enth_mol_phase": {"method": None},
+                "mole_frac_phase_comp": {"method": None},
+            }
+        )
+        obj.add_default_units(
+            {
+                "time": pyunits.s,
+                "length": pyunits.m,
+                "mass": pyunits.kg,
+                "amount": pyunits.mol,
+                "temperature": pyunits.K,
+            }
+        )
+
+
+class _SteamSurrogateStateBlock(StateBlock):
+    """
+    Methods applied to indexed state blocks of the steam surrogate.
+    """
+
+    def initialize(blk, state_args=None, hold_state=False, outlvl=idaeslog.NOTSET, **kwargs):
+        """
+        All properties are explicit functions of the state variables, so initialisation
+        only sets the state variables from state_args (if given) and optionally fixes them.
+        """
+        init_log = idaeslog.getInitLogger(blk.name, outlvl, tag="properties")
+        flags = {}
+        for k, b in blk.items():
+            for name, var in b.define_state_vars().items():
+                if state_args is not None and name in state_args and not var.fixed:
+                    var.set_value(state_args[name])
+                if hold_state:
+                    flags[k, name] = var.fixed
+                    var.fix()
+        init_log.info("Initialisation Complete.")
+        if hold_state:
+            return flags
+
+    def release_state(blk, flags, outlvl=idaeslog.NOTSET):
+        if flags is None:
+            return
+        for (k, name), was_fixed in flags.items():
+            if not was_fixed:
+                blk[k].define_state_vars()[name].unfix()
+
+
+@declare_process_block_class(
+    "SteamSurrogateStateBlock", block_class=_SteamSurrogateStateBlock
+)
+class SteamSurrogateStateBlockData(StateBlockData):
+    """
+    State block for the steam surrogate. Properties are Expressions of the state variables.
+    """
+
+    def build(self):
+        super().build()
+        params = self.params
+        coeffs = params.coeffs
+
+        self.flow_mol = Var(
+            initialize=1, bounds=(0, None), units=pyunits.mol / pyunits.s, doc="Total molar flow"
+        )
+        self.enth_mol = Var(
+            initialize=5e3, units=pyunits.J / pyunits.mol, doc="Total molar enthalpy"
+        )
+        self.pressure = Var(
+            initialize=101325,
+            bounds=params.table_pressure_range,
+            units=pyunits.Pa,
+            doc="Pressure",
+        )
+
+        # Dimensionless features used by the fits
+        lnp = log(self.pressure / (P_REF * pyunits.Pa))
+        h = self.enth_mol / (H_SCALE * pyunits.J / pyunits.mol)
+        eps = params.smoothing_eps
+
+        self.temperature_sat = Expression(
+            expr=_poly1(coeffs["temperature_sat"], lnp) * pyunits.K,
+            doc="Saturation temperature",
+        )
+        h_liq_sat = _poly1(coeffs["enth_mol_liq_sat"], lnp)
+        h_vap_sat = _poly1(coeffs["enth_mol_vap_sat"], lnp)
+
+        self.vapor_frac = Expression(
+            expr=smooth_max(
+                0, smooth_min(1, (h - h_liq_sat) / (h_vap_sat - h_liq_sat), eps), eps
+            ),
+            doc="Vapor fraction",
+        )
+
+        # Below saturation the liquid fit is used, above it the vapour fit, each only
+        # over the enthalpies it was fitted to.
+        self.temperature = Expression(
+            expr=_scaled_temperature(coeffs, h, lnp, eps, smooth_max, smooth_min)
+            * 100
+            * pyunits.K,
+            doc="Temperature",
+        )
+
+        self.phase_frac = Expression(
+            params.phase_list,
+            rule=lambda b, p: b.vapor_frac if p == "Vap" else 1 - b.vapor_frac,
+            doc="Phase fraction",
+        )
+        self.enth_mol_phase = Expression(
+            params.phase_list,
+            rule=lambda b, p: (
+                smooth_max(h, h_vap_sat, eps)
+                if p == "Vap"
+                else smooth_min(h, h_liq_sat, eps)
+            )
+            * H_SCALE
+            * pyunits.J
+            / pyunits.mol,
+            doc="Phase molar enthalpy",
+        )
+        self.mole_frac_phase_comp = Expression(
+            params.phase_list,
+            params.component_list,
+            rule=lambda b, p, j: 1,
+            doc="Phase mole fractions (pure component)",
+        )
+
+    def get_material_flow_terms(self, p, j):
+        return self.flow_mol * self.phase_frac[p]
+
+    def get_enthalpy_flow_terms(self, p):
+        return self.flow_mol * self.phase_frac[p] * self.enth_mol_phase[p]
+
+    def default_material_balance_type(self):
+        return MaterialBalanceType.componentTotal
+
+    def default_energy_balance_type(self):
+        return EnergyBalanceType.enthalpyTotal
+
+    def get_material_flow_basis(self):
+        return MaterialFlowBasis.molar
+
+    def define_state_vars(self):
+        return {
+            "flow_mol": self.flow_mol,
+            "enth_mol": self.enth_mol,
+            "pressure": self.pressure,
+        }
+
+    def define_display_vars(self):
+        return {
+            "Molar Flow": self.flow_mol,
+            "Molar Enthalpy": self.enth_mol,
+            "Pressure": self.pressure,
+            "Temperature": self.temperature,
+            "Vapor Fraction": self.vapor_frac,
+        }
+
+
+if __name__ == "__main__":
+    generate_table()
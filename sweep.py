@@ -0,0 +1,131 @@
+"""
+Parallel sweep runner for flowsheet experiments.
+
+Each worker process builds the flowsheet once (with the builder function), takes a
+snapshot (see state_snapshot.py) of the specified-but-unsolved model, and then runs
+the cases it is given, restoring that snapshot before each one. The time, iteration count and status
+of every case are collected into a DataFrame.
+
+The builder and case functions must be importable (defined at module level) so they
+can be sent to the worker processes. Each worker only calls the builder once, so the
+property parameter blocks are built once per worker whatever the builder does; builders
+that use the milk/water/helmholtz blocks can still take them from
+property_cache.cached_parameter_block, but the sweep itself doesn't need to.
+
+Example (see initialisation_experiment_evaporator.py):
+
+    from evaporator_flowsheet import build_flowsheet, initialize
+
+    def run_heat_duty_case(m, heat_duty):
+        m.fs.effect_1.heat_duty.fix(heat_duty)
+        initialize(m)
+        return solve(m)
+
+    if __name__ == "__main__":
+        cases = [{"heat_duty": q} for q in HEAT_DUTY_VALUES]
+        results = run_sweep(build_flowsheet, run_heat_duty_case, cases)
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import idaes.logger as idaeslog
+
+from state_snapshot import SnapshotIndex
+
+_log = idaeslog.getLogger(__name__)
+
+# Per-process state, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(builder, builder_kwargs):
+    m = builder(**builder_kwargs)
+    _worker["model"] = m
+    _worker["index"] = SnapshotIndex(m)
+    _worker["default_values"] = _worker["index"].take()
+
+
+def _result_row(result):
+    """
+    Pull the iteration count and status out of whatever the case function returned:
+    a pyomo.contrib.solver Results, a legacy SolverResults, a dict, or None.
+    """
+    if result is None:
+        return {}
+    if isinstance(result, dict):
+        return dict(result)
+    if hasattr(result, "iteration_count"):
+        # New solver interface (pyomo.contrib.solver)
+        return {
+            "iterations": result.iteration_count,
+            "status": str(result.solution_status),
+            "termination_condition": str(result.termination_condition),
+        }
+    if hasattr(result, "solver"):
+        # Legacy SolverFactory results
+        return {
+            "iterations": getattr(result.solver, "iterations", None),
+            "status": str(result.solver.status),
+            "termination_condition": str(result.solver.termination_condition),
+        }
+    return {"result": result}
+
+
+def _run_case(case_fn, params, restore):
+    m = _worker["model"]
+    if restore:
+        _worker["index"].restore(_worker["default_values"])
+    start = time.time()
+    try:
+        row = _result_row(case_fn(m, **params))
+        row.setdefault("error", None)
+    except Exception as e:  # a failing case shouldn't take down the sweep
+        row = {"error": repr(e)}
+    row["time"] = time.time() - start
+    row["worker"] = os.getpid()
+    return row
+
+
+def run_sweep(
+    builder,
+    case_fn,
+    cases,
+    max_workers=None,
+    restore=True,
+    builder_kwargs=None,
+):
+    """
+    Run case_fn(m, **params) for every params dict in cases, spread over a process pool.
+
+    Args:
+        builder: function returning a specified flowsheet model. Called once per worker.
+        case_fn: function taking the model and the case parameters as keyword arguments,
+            that solves the case and returns the solver results (or a dict of results).
+        cases: list of parameter dicts.
+        max_workers: number of worker processes, defaults to the number of cores.
+        restore: restore the freshly built model before each case. If False, each
+            case starts from wherever the previous case on that worker finished.
+        builder_kwargs: keyword arguments passed to builder.
+
+    Returns:
+        DataFrame with one row per case (in the order of cases), containing the case
+        parameters, time, iterations, status and any error.
+    """
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(builder, builder_kwargs or {}),
+    ) as executor:
+        futures = [
+            executor.submit(_run_case, case_fn, params, restore) for params in cases
+        ]
+        rows = []
+        for params, future in zip(cases, futures):
+            row = dict(params)
+            row.update(future.result())
+            if row["error"] is not None:
+                _log.warning(f"Case {params} failed: {row['error']}")
+            rows.append(row)
+    return pd.DataFrame(rows)
@@ -17,6 +17,16 @@ from idaes.core import (
 from idaes.core.util.config import is_physical_parameter_block
 import idaes.core.util.scaling as iscale
 import idaes.logger as idaeslog
+from idaes.models.properties.general_helmholtz.helmholtz_functions import (
+    HelmholtzParameterBlockData,
+)
+from reference_offsets import (
+    load_offsets,
+    enth_mol_offset_expr,
+    optional_path,
+    enth_mol_offset_correction,
+)
+from unit_scaling import seed_state_scaling, state_scaling_factor
 
 # Set up logger
 _log = idaeslog.getLogger(__name__)
@@ -36,12 +46,46 @@ class GenericTranslatorData(TranslatorData):
      
     """
 
+    CONFIG = TranslatorData.CONFIG()
+    CONFIG.declare(
+        "reference_offset_table",
+        ConfigValue(
+            default=None,
+            domain=optional_path,
+            description="Reference enthalpy offset table to correct the enthalpy balance with",
+            doc="""Path to a table from reference_offsets.py. If given, the liquid enthalpy offset
+    (Helmholtz - milk package) at the inlet temperature is added to the enthalpy when translating
+    into the Helmholtz package, or subtracted when translating out of it,
+    **default** - None (no correction).""",
+        ),
+    )
+
     def build(self):
         self.CONFIG.outlet_state_defined = False # See constraint for flow
         #self.CONFIG.has_phase_equilibrium = True # I don't think it matters if this is set, becuase in theory the phase equilibrium should
         # already have been calculated in the inlet stream.
         super().build()
 
+        if self.config.reference_offset_table is not None:
+            coeffs = load_offsets(self.config.reference_offset_table)[
+                "enth_mol_offset_coeffs"
+            ]
+            # The offset is Helmholtz - milk package
+            sign = (
+                -1
+                if isinstance(
+                    self.config.inlet_property_package, HelmholtzParameterBlockData
+                )
+                else 1
+            )
+
+            @self.Expression(
+                self.flowsheet().time,
+                doc="Correction for the reference enthalpy offset between the packages",
+            )
+            def reference_offset_correction(b, t):
+                return sign * enth_mol_offset_expr(coeffs, b.properties_in[t].temperature)
+
         # Pressure (= inlet pressure)
         @self.Constraint(
             self.flowsheet().time,
@@ -57,7 +101,8 @@ class GenericTranslatorData(TranslatorData):
         )
         def eq_outlet_enth_mol(b, t):
             return (
-                b.properties_in[t].enth_mol == b.properties_out[t].enth_mol
+                b.properties_in[t].enth_mol + enth_mol_offset_correction(b, t)
+                == b.properties_out[t].enth_mol
             )
         
         # Flow
@@ -72,5 +117,64 @@ class GenericTranslatorData(TranslatorData):
                 - b.properties_in[t].get_material_flow_terms(p, c)
                 for p in b.properties_out[t].phase_list
                 if (p, c) in b.properties_out[t].phase_component_set
-            ) 
+            )
 
+    def input_vars(self, t):
+        """
+        The inlet state variables at time t, by name, with (name, index) keys for
+        indexed ones (e.g ("mole_frac_comp", "h2o")).
+        """
+        inputs = {}
+        for name, var in self.properties_in[t].define_state_vars().items():
+            if var.is_indexed():
+                inputs.update({(name, k): v for k, v in var.items()})
+            else:
+                inputs[name] = var
+        return inputs
+
+    def update_inputs(self, t=None, **values):
+        """
+        Change the inlet state in place, without rebuilding the model, so the model
+        structure, scaling factors and current solution are kept. Indexed state variables
+        take a dict, e.g update_inputs(temperature=350, mole_frac_comp={"h2o": 0.98, ...}).
+
+        Returns the list of variables that were changed.
+        """
+        time_points = self.flowsheet().time if t is None else [t]
+        changed = []
+        for t in time_points:
+            inputs = self.input_vars(t)
+            for name, val in values.items():
+                updates = (
+                    {(name, k): x for k, x in val.items()}
+                    if isinstance(val, dict)
+                    else {name: val}
+                )
+                for key, x in updates.items():
+                    if key not in inputs:
+                        raise KeyError(f"{self.name} has no inlet state variable {key}")
+                    inputs[key].set_value(x)
+                    changed.append(inputs[key])
+        return changed
+
+    def calculate_scaling_factors(self):
+        seed_state_scaling(
+            sb
+            for t in self.flowsheet().time
+            for sb in (self.properties_in[t], self.properties_out[t])
+        )
+        super().calculate_scaling_factors()
+
+        for t in self.flowsheet().time:
+            sb = self.properties_in[t]
+            iscale.constraint_scaling_transform(
+                self.eq_outlet_pressure[t], state_scaling_factor(sb, "pressure"), overwrite=False
+            )
+            iscale.constraint_scaling_transform(
+                self.eq_outlet_enth_mol[t], state_scaling_factor(sb, "enth_mol"), overwrite=False
+            )
+            sf_flow = state_scaling_factor(sb, "flow_mol")
+            for c in self.config.outlet_property_package.component_list:
+                iscale.constraint_scaling_transform(
+                    self.eq_outlet_composition[t, c], sf_flow, overwrite=False
+                )
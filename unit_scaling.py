@@ -0,0 +1,69 @@
+"""
+Scaling helpers shared by Dsi and GenericTranslator.
+
+Both units scale their own constraints from the scaling factors of the state block
+variables they connect. A factor comes from, in order:
+ - the variable itself (set by the user, or by the state block's own scaling),
+ - the property package's default (set_default_scaling, e.g the Helmholtz package has
+   defaults for flow_mol and enth_mol),
+ - DEFAULT_SCALING, so every factor the units need is defined.
+
+Usage, in a unit's calculate_scaling_factors:
+
+    seed_state_scaling([self.properties_in[t], ...])
+    super().calculate_scaling_factors()
+    sf_flow = state_scaling_factor(self.properties_in[t], "flow_mol")
+"""
+import idaes.core.util.scaling as iscale
+
+DEFAULT_SCALING = {
+    "flow_mol": 1,
+    "temperature": 1e-2,
+    "pressure": 1e-5,
+    "enth_mol": 1e-4,
+}
+
+
+def _default(sb, name):
+    sf = sb.params.get_default_scaling(name)
+    return DEFAULT_SCALING[name] if sf is None else sf
+
+
+def _set_scaling_factor(var, sf):
+    if var.is_indexed():
+        for v in var.values():
+            iscale.set_scaling_factor(v, sf, overwrite=False)
+    else:
+        iscale.set_scaling_factor(var, sf, overwrite=False)
+
+
+def seed_state_scaling(state_blocks):
+    """
+    Set DEFAULT_SCALING on the state variables of state_blocks that have neither a
+    scaling factor nor a property package default, so the state blocks' own scaling
+    (super().calculate_scaling_factors()) has something to work from. Variables the
+    package has a default for are left to the package.
+    """
+    for sb in state_blocks:
+        for name, var in sb.define_state_vars().items():
+            if name not in DEFAULT_SCALING:
+                continue
+            if sb.params.get_default_scaling(name) is not None:
+                continue
+            if iscale.get_scaling_factor(var, default=None, warning=False) is None:
+                _set_scaling_factor(var, DEFAULT_SCALING[name])
+
+
+def state_scaling_factor(sb, name):
+    """
+    Scaling factor of the state block variable sb.<name> (see the module docstring for
+    where it comes from). If the variable doesn't have one yet, it is set on it.
+    """
+    var = getattr(sb, name)
+    sf = iscale.get_scaling_factor(
+        next(iter(var.values())) if var.is_indexed() else var, default=None, warning=False
+    )
+    if sf is None:
+        sf = _default(sb, name)
+        _set_scaling_factor(var, sf)
+    return sf
@@ -0,0 +1,136 @@
+"""
+Warm start store for repeated Dsi flowsheet solves.
+
+Solving a flowsheet from a previously converged solution is much quicker than
+initialising it (see the results at the bottom of initialisation_experiment_evaporator.py:
+~3 iterations vs 40-140), so this keeps flat snapshots of converged solutions (see
+state_snapshot.py), keyed by the fixed inputs of the flowsheet. Before a new solve, the
+unfixed variables get their values from the snapshot with the closest inputs. Fixed
+variables, and which variables are fixed, are left alone, so the new inputs and any spec
+switches made since the snapshot was taken are kept.
+
+Example:
+
+    store = WarmStartStore({
+        "heat_duty": m.fs.effect_1.heat_duty[0],
+        "inlet_flow": m.fs.dsi.inlet.flow_mol[0],
+    })
+    for heat_duty in HEAT_DUTY_VALUES:
+        m.fs.effect_1.heat_duty.fix(heat_duty)
+        if not store.restore(m):
+            initialize()
+        results = opt.solve(m)
+        if results.solver.termination_condition == pyo.TerminationCondition.optimal:
+            store.add(m)
+"""
+import math
+
+import numpy as np
+import pyomo.environ as pyo
+import idaes.logger as idaeslog
+
+from state_snapshot import SnapshotIndex
+
+_log = idaeslog.getLogger(__name__)
+
+
+class WarmStartStore:
+    """
+    Stores converged solutions of a model, keyed by the values of its fixed inputs.
+
+    The snapshots are in the variable order of the first model passed to add, so the
+    store should only be used with that model (or copies of the same flowsheet).
+
+    Args:
+        inputs: dict of name: scalar Var (or VarData) that define the operating point,
+            e.g heat duty, outlet temperature, inlet flow and composition.
+        scales: optional dict of name: scale used to normalise the distance between
+            operating points. By default the range of the stored values is used.
+        max_snapshots: if set, the oldest snapshots are dropped once there are more than this.
+    """
+
+    def __init__(self, inputs, scales=None, max_snapshots=None):
+        self.inputs = dict(inputs)
+        self.scales = dict(scales) if scales else {}
+        self.max_snapshots = max_snapshots
+        self.index = None
+        self._keys = []
+        self._values = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def current_key(self):
+        return tuple(pyo.value(var) for var in self.inputs.values())
+
+    def add(self, m):
+        """
+        Store the current (converged) solution of m.
+        """
+        if self.index is None:
+            self.index = SnapshotIndex(m)
+        self._keys.append(self.current_key())
+        # Fixed flags are never restored, so only keep the values
+        self._values.append(self.index.take().values)
+        if self.max_snapshots is not None and len(self._values) > self.max_snapshots:
+            self._keys.pop(0)
+            self._values.pop(0)
+
+    def _scale(self, i, name):
+        if name in self.scales:
+            return self.scales[name]
+        values = [key[i] for key in self._keys]
+        spread = max(values) - min(values)
+        return spread if spread > 0 else max(abs(values[0]), 1)
+
+    def _distance(self, a, b):
+        return math.sqrt(
+            sum(
+                ((x - y) / self._scale(i, name)) ** 2
+                for i, (name, x, y) in enumerate(zip(self.inputs, a, b))
+            )
+        )
+
+    def nearest(self, key=None, n=1):
+        """
+        Return the indexes of the n stored snapshots closest to key
+        (by default the current input values), closest first.
+        """
+        if key is None:
+            key = self.current_key()
+        order = sorted(range(len(self._keys)), key=lambda i: self._distance(key, self._keys[i]))
+        return order[:n]
+
+    def restore(self, m, interpolate=False):
+        """
+        Set the unfixed variables of m to their values in the snapshot closest to the
+        current inputs. Fixed variables keep their current values.
+
+        If interpolate is True and there are at least two snapshots, the values are
+        linearly interpolated between the two closest snapshots (by distance), which
+        gives a better starting point when the new inputs lie between them.
+
+        Returns False if there is nothing to restore from.
+        """
+        if not self._values:
+            return False
+        key = self.current_key()
+        closest = self.nearest(key, n=2 if interpolate else 1)
+        values = self._values[closest[0]]
+
+        if interpolate and len(closest) == 2:
+            d0 = self._distance(key, self._keys[closest[0]])
+            d1 = self._distance(key, self._keys[closest[1]])
+            if d0 + d1 > 0:
+                w = d1 / (d0 + d1)  # weight of the closest snapshot
+                other = self._values[closest[1]]
+                # Where either value is missing keep the closest one
+                values = np.where(
+                    np.isnan(other), values, w * values + (1 - w) * other
+                )
+
+        for v, val in zip(self.index.vars, values.tolist()):
+            if not v.fixed and val == val:
+                v.set_value(val, skip_validation=True)
+        _log.debug(f"Warm started from snapshot {closest[0]} with inputs {self._keys[closest[0]]}")
+        return True